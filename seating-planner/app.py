@@ -1,12 +1,188 @@
 from flask import Flask, render_template, request, send_file, jsonify
+from flask.json.provider import DefaultJSONProvider
+from pydantic import BaseModel, ValidationError
 from seating_model import SeatingPlanner
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
 import json
+import logging
+import orjson
 import os
-import traceback
+import tempfile
+import threading
+import time
+import uuid
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Route jsonify and request.get_json through orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+logging.basicConfig(level=logging.INFO)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 planner = SeatingPlanner()
 
+# Request schemas, validated in one pass by pydantic-core
+class ClassSpec(BaseModel):
+    name: str
+    start_roll: int
+    end_roll: int
+    tc: str = ''
+    leet: str = ''
+
+class HallSpec(BaseModel):
+    name: str
+    rows: int
+    columns: int
+    students_per_desk: int
+
+class TeacherSpec(BaseModel):
+    name: str
+    subject: str
+
+class SubjectSpec(BaseModel):
+    name: str
+    difficulty: int
+
+class ClassSubjectsSpec(BaseModel):
+    class_name: str
+    subjects: list[SubjectSpec]
+
+class SeatingRequest(BaseModel):
+    classes: list[ClassSpec] = []
+    halls: list[HallSpec] = []
+
+class ScheduleRequest(BaseModel):
+    classes: list[ClassSpec] = []
+    halls: list[HallSpec] = []
+    teachers: list[TeacherSpec] = []
+    class_subjects: list[ClassSubjectsSpec] = []
+    date_mode: str = 'auto'
+    manual_dates: dict[str, dict] = {}
+    start_date: str = ''
+    end_date: str = ''
+    exams_per_day: int = 1
+    invigilators_per_hall: int = 2
+
+class ResultCache:
+    """Bounded LRU of generated results, keyed by a digest of the request content"""
+    
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(payload):
+        return hashlib.blake2b(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).digest()
+    
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+    
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+seating_cache = ResultCache()
+schedule_cache = ResultCache()
+# Rendered PDF bytes; kept small as a schedule PDF can run to megabytes
+seating_pdf_cache = ResultCache(maxsize=16)
+schedule_pdf_cache = ResultCache(maxsize=16)
+
+# PDF rendering runs off the request worker. Job state lives in files under PDF_JOB_DIR
+# (<id>.name while the job exists, then <id>.pdf or <id>.err), so a status poll can be
+# answered by any gunicorn worker on the host, not just the one that took the job
+executor = ThreadPoolExecutor(max_workers=4)
+PDF_JOB_DIR = os.environ.get('PDF_JOB_DIR', os.path.join(tempfile.gettempdir(), 'seating-planner-pdf-jobs'))
+PDF_JOB_TTL = 600
+os.makedirs(PDF_JOB_DIR, exist_ok=True)
+
+def render_pdf(render, cache, payload):
+    """Render payload to a PDF stream, reusing an earlier render of the same content"""
+    cache_key = ResultCache.key(payload)
+    pdf = cache.get(cache_key)
+    if pdf is None:
+        pdf = render(payload).getvalue()
+        cache.put(cache_key, pdf)
+    return io.BytesIO(pdf)
+
+def pdf_job_file(job_id, suffix):
+    return os.path.join(PDF_JOB_DIR, job_id + suffix)
+
+def write_pdf_job_file(job_id, suffix, data):
+    """Write a job file in one step, so a poll never sees it half written"""
+    tmp_path = pdf_job_file(job_id, suffix + '.tmp')
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, pdf_job_file(job_id, suffix))
+
+def take_pdf_job_file(job_id, suffix):
+    """Read and delete a job file; None if it does not exist (or another poll took it)"""
+    try:
+        with open(pdf_job_file(job_id, suffix), 'rb') as fh:
+            data = fh.read()
+        os.remove(fh.name)
+    except FileNotFoundError:
+        return None
+    return data
+
+def expire_pdf_jobs():
+    """Delete the files of jobs nobody came back for"""
+    cutoff = time.time() - PDF_JOB_TTL
+    with os.scandir(PDF_JOB_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+def run_pdf_job(job_id, render, cache, payload):
+    try:
+        pdf = render_pdf(render, cache, payload).getvalue()
+    except Exception as e:
+        app.logger.exception("Error in pdf job %s", job_id)
+        write_pdf_job_file(job_id, '.err', f'Failed to generate PDF: {str(e)}'.encode())
+    else:
+        write_pdf_job_file(job_id, '.pdf', pdf)
+
+def submit_pdf_job(render, cache, payload, download_name):
+    """Queue a PDF render and return its job id"""
+    expire_pdf_jobs()
+    job_id = uuid.uuid4().hex
+    write_pdf_job_file(job_id, '.name', download_name.encode())
+    executor.submit(run_pdf_job, job_id, render, cache, payload)
+    return job_id
+
+def read_json():
+    """Parse the request body with orjson (None for an empty body)"""
+    raw = request.get_data()
+    return orjson.loads(raw) if raw else None
+
+def json_response(payload, status=200):
+    """Serialize payload with orjson; seating/schedule results can hold thousands of seats"""
+    return app.response_class(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                              status=status, mimetype='application/json')
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -14,133 +190,167 @@ def index():
 @app.route('/generate_seating', methods=['POST'])
 def generate_seating():
     try:
-        data = request.json
+        raw = request.get_data()
         
-        if not data:
-            return jsonify({'error': 'No data received'}), 400
+        if not raw:
+            return json_response({'error': 'No data received'}, 400)
         
-        classes = data.get('classes', [])
-        halls = data.get('halls', [])
+        req = SeatingRequest.model_validate_json(raw)
         
-        if not classes or not halls:
-            return jsonify({'error': 'Please provide both classes and halls data'}), 400
+        if not req.classes or not req.halls:
+            return json_response({'error': 'Please provide both classes and halls data'}, 400)
         
-        # Validate classes data
-        for cls in classes:
-            if 'name' not in cls or 'start_roll' not in cls or 'end_roll' not in cls:
-                return jsonify({'error': 'Invalid class data format'}), 400
+        classes = [cls.model_dump() for cls in req.classes]
+        halls = [hall.model_dump() for hall in req.halls]
         
-        # Validate halls data
-        for hall in halls:
-            if 'name' not in hall or 'rows' not in hall or 'columns' not in hall or 'students_per_desk' not in hall:
-                return jsonify({'error': 'Invalid hall data format'}), 400
+        cache_key = ResultCache.key([classes, halls])
+        result = seating_cache.get(cache_key)
+        if result is not None:
+            return json_response(result, 200)
         
         # Generate seating arrangement
         result = planner.generate_arrangement(classes, halls)
         
         if 'error' in result:
-            return jsonify(result), 400
+            return json_response(result, 400)
         
-        return jsonify(result), 200
+        seating_cache.put(cache_key, result)
+        return json_response(result, 200)
     
+    except ValidationError:
+        raise
     except Exception as e:
-        print(f"Error in generate_seating: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+        app.logger.exception("Error in generate_seating")
+        return json_response({'error': f'Server error: {str(e)}'}, 500)
 
 @app.route('/generate_exam_schedule', methods=['POST'])
 def generate_exam_schedule():
     try:
-        data = request.json
+        raw = request.get_data()
+        
+        if not raw:
+            return json_response({'error': 'No data received'}, 400)
         
-        if not data:
-            return jsonify({'error': 'No data received'}), 400
+        req = ScheduleRequest.model_validate_json(raw)
         
-        classes = data.get('classes', [])
-        halls = data.get('halls', [])
-        teachers = data.get('teachers', [])
-        class_subjects = data.get('class_subjects', [])
-        date_mode = data.get('date_mode', 'auto')
-        manual_dates = data.get('manual_dates', {})
-        start_date = data.get('start_date', '')
-        end_date = data.get('end_date', '')
-        exams_per_day = int(data.get('exams_per_day', 1))
-        invigilators_per_hall = int(data.get('invigilators_per_hall', 2))
+        if not req.classes or not req.halls or not req.teachers or not req.class_subjects:
+            return json_response({'error': 'Please provide all required data'}, 400)
         
-        if not classes or not halls or not teachers or not class_subjects:
-            return jsonify({'error': 'Please provide all required data'}), 400
+        cache_key = ResultCache.key(req.model_dump())
+        result = schedule_cache.get(cache_key)
+        if result is not None:
+            return json_response(result, 200)
         
         # Generate complete exam schedule
         result = planner.generate_exam_schedule(
-            classes=classes,
-            halls=halls,
-            teachers=teachers,
-            class_subjects=class_subjects,
-            date_mode=date_mode,
-            manual_dates=manual_dates,
-            start_date=start_date,
-            end_date=end_date,
-            exams_per_day=exams_per_day,
-            invigilators_per_hall=invigilators_per_hall
+            classes=[cls.model_dump() for cls in req.classes],
+            halls=[hall.model_dump() for hall in req.halls],
+            teachers=[teacher.model_dump() for teacher in req.teachers],
+            class_subjects=[cs.model_dump() for cs in req.class_subjects],
+            date_mode=req.date_mode,
+            manual_dates=req.manual_dates,
+            start_date=req.start_date,
+            end_date=req.end_date,
+            exams_per_day=req.exams_per_day,
+            invigilators_per_hall=req.invigilators_per_hall
         )
         
         if 'error' in result:
-            return jsonify(result), 400
+            return json_response(result, 400)
         
-        return jsonify(result), 200
+        schedule_cache.put(cache_key, result)
+        return json_response(result, 200)
     
+    except ValidationError:
+        raise
     except Exception as e:
-        print(f"Error in generate_exam_schedule: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+        app.logger.exception("Error in generate_exam_schedule")
+        return json_response({'error': f'Server error: {str(e)}'}, 500)
 
 @app.route('/download_pdf', methods=['POST'])
 def download_pdf():
     try:
-        data = request.json
+        data = read_json()
+        if not isinstance(data, dict):
+            return json_response({'error': 'Request body must be a JSON object'}, 400)
         arrangement = data.get('arrangement', {})
         
-        if not arrangement:
-            return jsonify({'error': 'No arrangement data provided'}), 400
+        if not arrangement or not isinstance(arrangement, dict):
+            return json_response({'error': 'No arrangement data provided'}, 400)
         
-        # Generate PDF
-        pdf_path = planner.generate_pdf(arrangement)
+        # Generate PDF in the background
+        job_id = submit_pdf_job(planner.generate_pdf, seating_pdf_cache, arrangement, 'seating_arrangement.pdf')
         
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name='seating_arrangement.pdf',
-            mimetype='application/pdf'
-        )
+        return json_response({'job_id': job_id}, 202)
     
+    except orjson.JSONDecodeError:
+        return json_response({'error': 'Invalid JSON payload'}, 400)
     except Exception as e:
-        print(f"Error in download_pdf: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
+        app.logger.exception("Error in download_pdf")
+        return json_response({'error': f'Failed to generate PDF: {str(e)}'}, 500)
 
 @app.route('/download_exam_schedule_pdf', methods=['POST'])
 def download_exam_schedule_pdf():
     try:
-        data = request.json
+        data = read_json()
+        if not isinstance(data, dict):
+            return json_response({'error': 'Request body must be a JSON object'}, 400)
         exam_schedule = data.get('exam_schedule', {})
         
-        if not exam_schedule:
-            return jsonify({'error': 'No exam schedule data provided'}), 400
+        if not exam_schedule or not isinstance(exam_schedule, dict):
+            return json_response({'error': 'No exam schedule data provided'}, 400)
         
-        # Generate comprehensive exam schedule PDF
-        pdf_path = planner.generate_exam_schedule_pdf(exam_schedule)
+        # Generate comprehensive exam schedule PDF in the background
+        job_id = submit_pdf_job(planner.generate_exam_schedule_pdf, schedule_pdf_cache, exam_schedule, 'exam_schedule_complete.pdf')
         
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name='exam_schedule_complete.pdf',
-            mimetype='application/pdf'
-        )
+        return json_response({'job_id': job_id}, 202)
     
+    except orjson.JSONDecodeError:
+        return json_response({'error': 'Invalid JSON payload'}, 400)
     except Exception as e:
-        print(f"Error in download_exam_schedule_pdf: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
+        app.logger.exception("Error in download_exam_schedule_pdf")
+        return json_response({'error': f'Failed to generate PDF: {str(e)}'}, 500)
+
+@app.route('/pdf_status/<job_id>')
+def pdf_status(job_id):
+    expire_pdf_jobs()
+    if not job_id.isalnum() or not os.path.exists(pdf_job_file(job_id, '.name')):
+        return json_response({'error': 'Unknown PDF job'}, 404)
+    
+    pdf = take_pdf_job_file(job_id, '.pdf')
+    error = None if pdf is not None else take_pdf_job_file(job_id, '.err')
+    if pdf is None and error is None:
+        return json_response({'status': 'pending'}, 202)
+    
+    download_name = take_pdf_job_file(job_id, '.name')
+    if download_name is None:
+        return json_response({'error': 'Unknown PDF job'}, 404)
+    if error is not None:
+        return json_response({'error': error.decode()}, 500)
+    
+    return send_file(
+        io.BytesIO(pdf),
+        as_attachment=True,
+        download_name=download_name.decode(),
+        mimetype='application/pdf'
+    )
+
+@app.route('/cache/clear', methods=['POST'])
+def clear_cache():
+    planner.clear_roster_cache()
+    seating_cache.clear()
+    schedule_cache.clear()
+    seating_pdf_cache.clear()
+    schedule_pdf_cache.clear()
+    return json_response({'status': 'Caches cleared'}, 200)
+
+@app.errorhandler(ValidationError)
+def invalid_request(e):
+    details = e.errors(include_url=False, include_context=False, include_input=False)
+    first = details[0]
+    location = '.'.join(str(part) for part in first['loc'])
+    message = f"Invalid request data: {location} - {first['msg']}" if location else f"Invalid request data: {first['msg']}"
+    return json_response({'error': message, 'details': details}, 400)
 
 @app.errorhandler(404)
 def not_found(e):
@@ -151,17 +361,10 @@ def server_error(e):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    # Create necessary directories
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     os.makedirs('static', exist_ok=True)
     os.makedirs('templates', exist_ok=True)
-    os.makedirs('output', exist_ok=True)
     
-    print("Starting Flask application...")
-    print("Available routes:")
-    print("  / - Main page")
-    print("  /generate_seating - POST endpoint for generating seating")
-    print("  /generate_exam_schedule - POST endpoint for generating exam schedule")
-    print("  /download_pdf - POST endpoint for downloading seating PDF")
-    print("  /download_exam_schedule_pdf - POST endpoint for downloading exam schedule PDF")
+    app.logger.info("Starting Flask application on port 5000")
     
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=os.environ.get('FLASK_ENV') == 'development', port=5000)
\ No newline at end of file
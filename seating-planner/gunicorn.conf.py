@@ -0,0 +1,10 @@
+import multiprocessing
+
+# Production server settings, picked up automatically by `gunicorn app:app`
+# when started from this directory.
+bind = "0.0.0.0:5000"
+# One sync worker per CPU; PDF jobs are tracked in a shared directory (see app.py),
+# so any worker can answer a status poll
+workers = multiprocessing.cpu_count()
+worker_class = "sync"
+timeout = 120
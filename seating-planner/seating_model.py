@@ -1,317 +1,1248 @@
 import numpy as np
-import pandas as pd
+import orjson
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-import random
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, PageBreak, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus.flowables import AnchorFlowable, Flowable
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import inch
 from datetime import datetime, timedelta
+import hashlib
+import io
+import logging
+import multiprocessing
 import os
+import threading
 from collections import deque, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from array import array
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # OR-Tools is optional; it only backs up _solve_csp on hard instances
+    cp_model = None
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # pypdf is optional; exam schedule PDFs then always build in one pass
+    PdfWriter = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_roll_list(text):
+    """Parse a comma separated roll list into an int64 array, ignoring anything that is not a number"""
+    if not text:
+        return np.empty(0, dtype=np.int64)
+    return np.array([int(x.strip()) for x in text.split(',') if x.strip().isdigit()], dtype=np.int64)
+
+
+@lru_cache(maxsize=4096)
+def _class_roster(start_roll, end_roll, tc, leet):
+    """Roll numbers of one class as parallel (roll_no, is_leet) arrays, excluding TC students.
+
+    Classes are re-submitted with every seating/schedule request, so rosters are
+    memoized for the life of the process (see SeatingPlanner.clear_roster_cache);
+    the arrays are returned read-only for that reason.
+    """
+    rolls = np.arange(start_roll, end_roll + 1, dtype=np.int64)
+    regular = rolls[~np.isin(rolls, _parse_roll_list(tc))]
+    roll_no = np.concatenate([regular, _parse_roll_list(leet)])
+    is_leet = np.arange(len(roll_no)) >= len(regular)
+    roll_no.flags.writeable = False
+    is_leet.flags.writeable = False
+    return roll_no, is_leet
+
+
+@njit(cache=True, fastmath=True)
+def _score_layout(seat_class, rows, cols, per_desk):
+    """Count seating-rule violations in a flat row-major array of seat class ids (-1 = empty).
+
+    A violation is two classmates on the same desk, or classmates either side of
+    the boundary between neighbouring desks in a row.
+    """
+    conflicts = 0
+    for r in range(rows):
+        for c in range(cols):
+            base = (r * cols + c) * per_desk
+            for a in range(per_desk):
+                cid = seat_class[base + a]
+                if cid < 0:
+                    continue
+                for b in range(a + 1, per_desk):
+                    if seat_class[base + b] == cid:
+                        conflicts += 1
+            if c + 1 < cols:
+                cid = seat_class[base + per_desk - 1]
+                if cid >= 0 and seat_class[base + per_desk] == cid:
+                    conflicts += 1
+    return conflicts
+
+
+@njit(cache=True)
+def _can_place(grid, desk_mask, row, col, seat_idx, class_id):
+    """Seating rules for one seat of a (rows, cols, per_desk) class-id grid.
+
+    desk_mask[row, col] has bit class_id set (in word class_id >> 6) when that class
+    already sits at the desk; the outer seats of the neighbouring desks come from grid.
+    """
+    cols, per_desk = grid.shape[1], grid.shape[2]
+    same_desk = (desk_mask[row, col, class_id >> 6] >> np.uint64(class_id & 63)) & np.uint64(1)
+    left = (seat_idx == 0) & (col > 0) & (grid[row, max(col - 1, 0), per_desk - 1] == class_id)
+    right = (seat_idx == per_desk - 1) & (col < cols - 1) & (grid[row, min(col + 1, cols - 1), 0] == class_id)
+    return not ((same_desk != 0) | left | right)
+
+
+@njit(cache=True)
+def _place_rows(grid, seat_student, queues, head, count, class_order, spread, placed_stack, top, start_row):
+    """Greedy row-by-row placement of rows start_row onwards; returns the new stack top.
+
+    Class c's students are queues[c, head[c]:count[c]] and are consumed from the
+    front. Each seat first tries the row's classes in class_order[row], skipping the
+    class seated in front of it when spread[row] is set, then any class that still
+    fits. The class in front is kept per column as placements happen instead of
+    re-reading the previous row.
+    The flat seat index of every placement is pushed onto placed_stack[top:], in order.
+    """
+    rows, cols, per_desk = grid.shape
+    num_classes = queues.shape[0]
+    waiting = count - head    # students each class still has to seat
+    total = waiting.sum()
+    active = np.zeros(num_classes, dtype=np.bool_)
+    desk_mask = np.zeros((rows, cols, (num_classes + 63) // 64), dtype=np.uint64)
+    for row in range(rows):
+        for col in range(cols):
+            for seat_idx in range(per_desk):
+                c = grid[row, col, seat_idx]
+                if c >= 0:
+                    desk_mask[row, col, c >> 6] |= np.uint64(1) << np.uint64(c & 63)
+    front = np.full(cols, -1, dtype=np.int32)      # first class seated at each desk of the previous row
+    current = np.full(cols, -1, dtype=np.int32)    # same, for the row being filled
+    if start_row > 0:
+        for col in range(cols):
+            for k in range(per_desk):
+                if grid[start_row - 1, col, k] >= 0:
+                    front[col] = grid[start_row - 1, col, k]
+                    break
+    placed = 0
+
+    for row in range(start_row, rows):
+        for c in range(num_classes):
+            active[c] = waiting[c] > 0
+
+        for col in range(cols):
+            last = front[col] if spread[row] else -1
+            for seat_idx in range(per_desk):
+                if placed >= total:
+                    break
+
+                chosen = -1
+                has_preferred = False
+                for i in range(num_classes):
+                    c = class_order[row, i]
+                    if active[c] and waiting[c] > 0 and c != last:
+                        has_preferred = True
+                        if _can_place(grid, desk_mask, row, col, seat_idx, c):
+                            chosen = c
+                            break
+                # Only the class in front is left: allow it after all
+                if chosen < 0 and not has_preferred:
+                    for i in range(num_classes):
+                        c = class_order[row, i]
+                        if active[c] and waiting[c] > 0 and _can_place(grid, desk_mask, row, col, seat_idx, c):
+                            chosen = c
+                            break
+                if chosen < 0:
+                    for c in range(num_classes):
+                        if waiting[c] > 0 and _can_place(grid, desk_mask, row, col, seat_idx, c):
+                            chosen = c
+                            break
+
+                if chosen >= 0:
+                    grid[row, col, seat_idx] = chosen
+                    desk_mask[row, col, chosen >> 6] |= np.uint64(1) << np.uint64(chosen & 63)
+                    seat_student[row, col, seat_idx] = queues[chosen, head[chosen]]
+                    head[chosen] += 1
+                    waiting[chosen] -= 1
+                    placed_stack[top + placed] = (row * cols + col) * per_desk + seat_idx
+                    placed += 1
+                    if current[col] < 0:
+                        current[col] = chosen
+
+        front[:] = current
+        current[:] = -1
+
+    return top + placed
+
+
+def _hopcroft_karp(indptr, indices, num_right):
+    """Maximum bipartite matching over a CSR graph (Hopcroft-Karp).
+
+    Left vertex u is adjacent to right vertices indices[indptr[u]:indptr[u + 1]].
+    Returns pair_u where pair_u[u] is the matched right vertex or -1.
+    """
+    # memoryviews index the int32 buffers as plain Python ints, without copying
+    indptr = memoryview(indptr)
+    indices = memoryview(indices)
+    num_left = len(indptr) - 1
+    inf = num_left + 1
+    pair_u = array('i', [-1]) * num_left
+    pair_v = array('i', [-1]) * num_right
+    dist = array('i', [0]) * num_left
+
+    while True:
+        # BFS: layer the free left vertices, stop at the first free right vertex layer
+        queue = deque()
+        for u in range(num_left):
+            if pair_u[u] == -1:
+                dist[u] = 0
+                queue.append(u)
+            else:
+                dist[u] = inf
+        free_layer = inf
+        while queue:
+            u = queue.popleft()
+            if dist[u] >= free_layer:
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                w = pair_v[indices[k]]
+                if w == -1:
+                    free_layer = min(free_layer, dist[u] + 1)
+                elif dist[w] == inf:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        if free_layer == inf:
+            break
+
+        # DFS: augment along vertex-disjoint shortest paths (iterative, no recursion limit)
+        next_edge = array('i', indptr[:-1])
+        for root in range(num_left):
+            if pair_u[root] != -1:
+                continue
+            stack = [root]
+            while stack:
+                u = stack[-1]
+                if next_edge[u] == indptr[u + 1]:
+                    dist[u] = inf
+                    stack.pop()
+                    continue
+                v = indices[next_edge[u]]
+                next_edge[u] += 1
+                w = pair_v[v]
+                if w == -1:
+                    if dist[u] + 1 != free_layer:
+                        continue
+                    for x in stack:
+                        v = indices[next_edge[x] - 1]
+                        pair_u[x] = v
+                        pair_v[v] = x
+                    break
+                if dist[w] == dist[u] + 1:
+                    stack.append(w)
+
+    return pair_u
+
+
+def _bits(mask):
+    """Indices of the set bits of an int bitmask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _solve_csp(domains, neighbours, loads, capacity, max_steps=200000):
+    """Assign every variable a value using forward checking and conflict-directed back-jumping.
+
+    domains[i] is the ordered list of values variable i may take, neighbours[i] the
+    variables that may not share its value, and loads[i] what it adds to a value whose
+    total may not exceed capacity. Returns the list of values, None when no
+    assignment exists, or False when the search gives up after max_steps.
+    Live domains and neighbour sets are held as int bitmasks (bit v = value v / variable v).
+    """
+    n = len(domains)
+    values = [None] * n
+    live = [sum(1 << v for v in d) for d in domains]
+    adjacent = [sum(1 << j for j in neighbours[i]) for i in range(n)]
+    pruned = [{} for _ in range(n)]        # value -> past variables that removed it
+    reductions = [[] for _ in range(n)]    # (j, value) removed by assigning i
+    conflicts = [set() for _ in range(n)]
+    candidates = [None] * n
+    used = defaultdict(int)
+    holders = defaultdict(set)
+
+    def retract(i):
+        for j, v in reductions[i]:
+            live[j] |= 1 << v
+            del pruned[j][v]
+        reductions[i].clear()
+        used[values[i]] -= loads[i]
+        holders[values[i]].discard(i)
+        values[i] = None
+
+    i = 0
+    if n:
+        candidates[0] = deque(_bits(live[0]))
+    steps = 0
+    while i < n:
+        steps += 1
+        if steps > max_steps:
+            return False
+
+        consistent = False
+        while candidates[i] and not consistent:
+            v = candidates[i].popleft()
+            if used[v] + loads[i] > capacity:
+                conflicts[i] |= holders[v]
+                continue
+            values[i] = v
+            used[v] += loads[i]
+            holders[v].add(i)
+
+            # Forward check: prune v from future variables it now rules out
+            wiped = None
+            bit = 1 << v
+            for j in range(i + 1, n):
+                if not live[j] & bit:
+                    continue
+                if adjacent[i] >> j & 1:
+                    culprits = {i}
+                elif used[v] + loads[j] > capacity:
+                    culprits = set(holders[v])
+                else:
+                    continue
+                live[j] ^= bit
+                pruned[j][v] = culprits
+                reductions[i].append((j, v))
+                if not live[j]:
+                    wiped = j
+                    break
+
+            if wiped is None:
+                consistent = True
+            else:
+                conflicts[i] |= set().union(*pruned[wiped].values()) - {i}
+                retract(i)
+
+        if consistent:
+            i += 1
+            if i < n:
+                candidates[i] = deque(_bits(live[i]))
+            continue
+
+        # Dead end: jump back to the most recent variable involved in the conflict
+        culprits = conflicts[i].union(*pruned[i].values())
+        if not culprits:
+            return None
+        h = max(culprits)
+        conflicts[h] |= culprits - {h}
+        for k in range(i, h, -1):
+            conflicts[k] = set()
+            if values[k] is not None:
+                retract(k)
+        retract(h)
+        i = h
+
+    return values
+
+
+def _solve_cp_sat(domains, neighbours, loads, capacity, time_limit=2.0):
+    """Same contract as _solve_csp, solved with OR-Tools CP-SAT; the fallback for
+    instances _solve_csp gives up on.
+
+    Neighbour sets are treated as groups (the exams of one class): at most one per
+    value, kept in variable order so they stay hardest first. Only feasibility is
+    asked for; returns None if no answer is found within time_limit.
+    """
+    model = cp_model.CpModel()
+    x = {}
+    for i, domain in enumerate(domains):
+        for v in domain:
+            x[i, v] = model.NewBoolVar(f"x_{i}_{v}")
+        model.AddExactlyOne(x[i, v] for v in domain)
+
+    slot_of = []
+    for i, domain in enumerate(domains):
+        slot = model.NewIntVar(min(domain, default=0), max(domain, default=0), f"slot_{i}")
+        model.Add(slot == sum(v * x[i, v] for v in domain))
+        slot_of.append(slot)
+
+    by_value = defaultdict(list)
+    for (i, v), var in x.items():
+        by_value[v].append(i)
+    for v, members in by_value.items():
+        model.Add(sum(loads[i] * x[i, v] for i in members) <= capacity)
+        for i in members:
+            if all(j > i for j in neighbours[i]):
+                model.AddAtMostOne([x[i, v]] + [x[j, v] for j in neighbours[i] if (j, v) in x])
+
+    for i in range(len(domains)):
+        later = [j for j in neighbours[i] if j > i]
+        if later:
+            model.Add(slot_of[i] < slot_of[min(later)])
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(model)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return [solver.Value(slot) for slot in slot_of]
+    return None
+
+
+# Seating halls in worker processes only pays off once there is enough work to
+# outweigh shipping the students over and back
+PARALLEL_MIN_STUDENTS = 2000
+# Likewise for rendering the slot pages of an exam schedule PDF in parallel (needs pypdf).
+# Serial rendering runs at roughly 3-7 ms a slot against ~0.5 s of fixed cost for the
+# parts (pickling, a document per part, the pypdf merge), so only large schedules gain
+PARALLEL_PDF_MIN_SLOTS = 300
+# Halls with more desks than this are drawn as a SeatingGrid rather than a Table in generate_pdf
+SEATING_GRID_MIN_DESKS = 200
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+_worker_planner = None
+
+
+def _get_process_pool():
+    """Process pool shared by all planners, started on first use.
+
+    Workers are spawned rather than forked: the Flask app runs PDF jobs on
+    threads, and a fresh interpreter also gets its own numpy seed.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=_get_worker_planner)
+        return _process_pool
+
+
+def _get_worker_planner():
+    """The SeatingPlanner private to this worker process"""
+    global _worker_planner
+    if _worker_planner is None:
+        _worker_planner = SeatingPlanner()
+    return _worker_planner
+
+
+def _arrange_hall(hall_students, rows, columns, students_per_desk):
+    """Pool task: SeatingPlanner._arrange_grid in a worker process"""
+    return _get_worker_planner()._arrange_grid(hall_students, rows, columns, students_per_desk)
+
+
+def _render_slot_pages(slot_items, slot_seating, with_heading, drawn_earlier):
+    """Pool task: SeatingPlanner._render_slot_pages in a worker process"""
+    return _get_worker_planner()._render_slot_pages(slot_items, slot_seating, with_heading, drawn_earlier)
+
+
+# ReportLab styles, built once and shared by every PDF. Paragraph and table styles
+# are only read while a document is built, so concurrent builds can share them.
+
+# Palette
+PRIMARY = colors.HexColor("#0d47a1")
+ACCENT = colors.HexColor("#1565c0")
+INDIGO = colors.HexColor("#283593")
+CLASS_BLUE = colors.HexColor("#1e88e5")
+GRID_LINE = colors.HexColor("#90caf9")
+PALE_BLUE = colors.HexColor("#e3f2fd")
+ALICE_BLUE = colors.HexColor("#f0f8ff")
+STRIPE = colors.HexColor("#f8fbff")
+ALERT_RED = colors.HexColor("#d32f2f")
+EMPTY_GREY = colors.HexColor("#9e9e9e")
+MUTED_GREY = colors.HexColor("#999999")
+NOTE_GREY = colors.HexColor("#555555")
+
+# Seating arrangement PDF (generate_pdf)
+SEATING_TITLE_STYLE = ParagraphStyle(
+    'Title',
+    fontSize=30,
+    leading=38,
+    textColor=PRIMARY,
+    alignment=1,
+    fontName="Helvetica-Bold",
+    spaceAfter=12
+)
+SEATING_SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    fontSize=15,
+    leading=22,
+    textColor=INDIGO,
+    alignment=1,
+    fontName="Helvetica-Bold",
+    spaceAfter=35
+)
+SEATING_SUMMARY_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), PALE_BLUE),
+    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+    ("FONTSIZE", (0, 0), (-1, -1), 11),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ("GRID", (0, 0), (-1, -1), 0.4, GRID_LINE),
+    ("LEFTPADDING", (0, 0), (-1, -1), 10),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+])
+HALL_BANNER_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), ACCENT),
+    ("TEXTCOLOR", (0, 0), (-1, -1), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 14),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("TOPPADDING", (0, 0), (-1, -1), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+])
+ROW_LABEL_STYLE = ParagraphStyle('RowLabel', fontSize=10, leading=13, alignment=1, fontName="Helvetica-Bold")
+CLASS_STYLE = ParagraphStyle('ClassCell', fontSize=10, leading=13, alignment=1, textColor=CLASS_BLUE)
+EMPTY_STYLE = ParagraphStyle('EmptyCell', fontSize=10, leading=13, alignment=1, textColor=EMPTY_GREY)
+SEATING_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), PRIMARY),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 11),
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
+    ("TOPPADDING", (0, 0), (-1, 0), 10),
+
+    ("BACKGROUND", (0, 1), (0, -1), PALE_BLUE),
+    ("TEXTCOLOR", (0, 1), (0, -1), PRIMARY),
+    ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
+    ("ALIGN", (0, 1), (0, -1), "CENTER"),
+
+    ("GRID", (0, 0), (-1, -1), 0.6, GRID_LINE),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("LEFTPADDING", (0, 0), (-1, -1), 10),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    ("TOPPADDING", (1, 1), (-1, -1), 8),
+    ("BOTTOMPADDING", (1, 1), (-1, -1), 8),
+    ("FONTSIZE", (1, 1), (-1, -1), 10),
+    ("ROWBACKGROUNDS", (1, 1), (-1, -1), [colors.white, STRIPE]),
+    # Plain-string desks (a lone student); Paragraph cells carry their own style
+    ("FONTNAME", (1, 1), (-1, -1), "Helvetica-Bold"),
+    ("TEXTCOLOR", (1, 1), (-1, -1), CLASS_BLUE),
+    ("ALIGN", (1, 1), (-1, -1), "CENTER"),
+])
+
+# Exam schedule PDF (generate_exam_schedule_pdf)
+SCHEDULE_TITLE_STYLE = ParagraphStyle(
+    'Title',
+    fontSize=32,
+    leading=40,
+    textColor=PRIMARY,
+    alignment=1,
+    fontName="Helvetica-Bold",
+    spaceAfter=15
+)
+SCHEDULE_SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle',
+    fontSize=16,
+    leading=24,
+    textColor=INDIGO,
+    alignment=1,
+    fontName="Helvetica-Bold",
+    spaceAfter=30
+)
+SECTION_STYLE = ParagraphStyle(
+    'Section',
+    fontSize=20,
+    leading=28,
+    textColor=ACCENT,
+    alignment=1,
+    fontName="Helvetica-Bold",
+    spaceAfter=20
+)
+SCHEDULE_SUMMARY_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), PALE_BLUE),
+    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+    ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 12),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ("GRID", (0, 0), (-1, -1), 0.5, GRID_LINE),
+    ("LEFTPADDING", (0, 0), (-1, -1), 12),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 12),
+    ("TOPPADDING", (0, 0), (-1, -1), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+])
+DATESHEET_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), ACCENT),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 10),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("GRID", (0, 0), (-1, -1), 0.5, GRID_LINE),
+    ("LEFTPADDING", (0, 0), (-1, -1), 6),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ("FONTSIZE", (0, 1), (-1, -1), 9),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, ALICE_BLUE]),
+])
+SLOT_BANNER_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), PRIMARY),
+    ("TEXTCOLOR", (0, 0), (-1, -1), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 16),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("TOPPADDING", (0, 0), (-1, -1), 10),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
+])
+CLASSES_LIST_STYLE = ParagraphStyle('ClassesList', fontSize=11, leading=14,
+                                    textColor=ACCENT, fontName="Helvetica-Bold")
+EXAM_INFO_STYLE = ParagraphStyle('ExamInfo', fontSize=10, leading=13, textColor=colors.black)
+HALL_HEADER_STYLE = ParagraphStyle('HallHeader', fontSize=12, leading=16,
+                                   textColor=ACCENT, fontName="Helvetica-Bold")
+HALL_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), ACCENT),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 10),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ("GRID", (0, 0), (-1, -1), 0.5, GRID_LINE),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ("FONTSIZE", (0, 1), (-1, -1), 9),
+    ("BACKGROUND", (0, 1), (-1, -1), ALICE_BLUE),
+])
+COMBINED_NOTE_STYLE = ParagraphStyle('CombinedNote', fontSize=11, leading=14,
+                                     textColor=ALERT_RED, fontName="Helvetica-Bold")
+SEATING_HEADER_STYLE = ParagraphStyle('SeatingHeader', fontSize=12, leading=16,
+                                      textColor=ACCENT, fontName="Helvetica-Bold")
+HALL_SUBTITLE_STYLE = ParagraphStyle('HallSubtitle', fontSize=11, leading=14,
+                                     textColor=INDIGO, fontName="Helvetica-Bold")
+SAME_SEATING_STYLE = ParagraphStyle('SameSeating', fontSize=10, leading=14,
+                                    textColor=NOTE_GREY, fontName="Helvetica-Oblique")
+NO_SEATING_STYLE = ParagraphStyle('NoSeating', fontSize=10, leading=14,
+                                  textColor=MUTED_GREY, fontName="Helvetica-Oblique")
+SLOT_ROW_LABEL_STYLE = ParagraphStyle('RowLabel', fontSize=9, leading=11, alignment=1, fontName="Helvetica-Bold")
+SLOT_CELL_STYLE = ParagraphStyle('Cell', fontSize=8, leading=10, alignment=1)
+SLOT_SEATING_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), ACCENT),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 9),
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+    
+    ("BACKGROUND", (0, 1), (0, -1), PALE_BLUE),
+    ("TEXTCOLOR", (0, 1), (0, -1), PRIMARY),
+    ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
+    ("ALIGN", (0, 1), (0, -1), "CENTER"),
+    
+    ("GRID", (0, 0), (-1, -1), 0.5, GRID_LINE),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("LEFTPADDING", (0, 0), (-1, -1), 4),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+    ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ("FONTSIZE", (1, 1), (-1, -1), 8),
+    ("ROWBACKGROUNDS", (1, 1), (-1, -1), [colors.white, STRIPE]),
+])
+# Difficulty shown as stars; STARS[d] for d in 0..10
+STARS = tuple("★" * i for i in range(11))
+
+
+class SeatingGrid(Flowable):
+    """Hall seating table drawn straight onto the canvas, for halls too big for a Table.
+
+    Looks like a table styled with SEATING_TABLE_STYLE but skips the per-cell
+    Paragraphs and Table layout. Each seat gets a line (two if the column is too
+    narrow), with the font shrunk so the widest seat fits its column. Splits
+    between rows and repeats the column header on every page.
+    """
+    HEADER_HEIGHT = 30
+    PADDING = 4
+    MAX_FONT_SIZE = 10
+    MIN_FONT_SIZE = 5
+
+    def __init__(self, seating, row_label_width, col_width, first_row=0, fit=None):
+        super().__init__()
+        self.seating = seating
+        self.row_label_width = row_label_width
+        self.col_width = col_width
+        self.first_row = first_row
+        self.cols = len(seating[0]) if seating else 0
+        self.seats_per_desk = len(seating[0][0]) if self.cols else 1
+        self.font_size, self.lines_per_seat = fit or self._fit()
+        self.leading = self.font_size * 1.25
+        self.row_height = self.seats_per_desk * self.lines_per_seat * self.leading + 2 * self.PADDING
+        self.width = row_label_width + col_width * self.cols
+        self.height = self.HEADER_HEIGHT + self.row_height * len(seating)
+
+    def _fit(self):
+        """(font size, lines per seat) that fit the widest seat of the hall in a column"""
+        roll_len = 0
+        labels = set()
+        for row in self.seating:
+            for desk in row:
+                for s in desk:
+                    if s:
+                        roll_len = max(roll_len, len(str(s['roll_no'])))
+                        labels.add(f" ({s['class_name']}){' [LEET]' if s.get('is_leet', False) else ''}")
+        # Digits share one width in Helvetica, so the longest roll number is the widest
+        roll_width = stringWidth("0" * roll_len, "Helvetica-Bold", 1)
+        label_width = max((stringWidth(label, "Helvetica", 1) for label in labels), default=0)
+        empty_width = stringWidth("Empty", "Helvetica-Oblique", 1)
+        room = self.col_width - 2 * self.PADDING
+        one_line = room / max(roll_width + label_width, empty_width)
+        if one_line >= self.MIN_FONT_SIZE:
+            return min(one_line, self.MAX_FONT_SIZE), 1
+        two_lines = room / max(roll_width, label_width, empty_width)
+        return max(min(two_lines, self.MAX_FONT_SIZE), self.MIN_FONT_SIZE), 2
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        fit_rows = int((availHeight - self.HEADER_HEIGHT) // self.row_height)
+        if fit_rows < 1 or fit_rows >= len(self.seating):
+            return []
+        fit = (self.font_size, self.lines_per_seat)
+        return [SeatingGrid(self.seating[:fit_rows], self.row_label_width, self.col_width, self.first_row, fit),
+                SeatingGrid(self.seating[fit_rows:], self.row_label_width, self.col_width,
+                            self.first_row + fit_rows, fit)]
+
+    def draw(self):
+        canv = self.canv
+        label_width, col_width, row_height = self.row_label_width, self.col_width, self.row_height
+        body_top = self.height - self.HEADER_HEIGHT
+
+        canv.setFillColor(PRIMARY)
+        canv.rect(0, body_top, self.width, self.HEADER_HEIGHT, stroke=0, fill=1)
+        canv.setFillColor(colors.whitesmoke)
+        canv.setFont("Helvetica-Bold", 11)
+        baseline = body_top + self.HEADER_HEIGHT / 2 - 4
+        for c in range(self.cols):
+            canv.drawCentredString(label_width + (c + 0.5) * col_width, baseline, f"Col {c + 1}")
+
+        for i, row in enumerate(self.seating):
+            y = body_top - (i + 1) * row_height
+            canv.setFillColor(PALE_BLUE)
+            canv.rect(0, y, label_width, row_height, stroke=0, fill=1)
+            if (self.first_row + i) % 2:
+                canv.setFillColor(STRIPE)
+                canv.rect(label_width, y, self.width - label_width, row_height, stroke=0, fill=1)
+            canv.setFillColor(PRIMARY)
+            canv.setFont("Helvetica-Bold", 10)
+            canv.drawCentredString(label_width / 2, y + row_height / 2 - 3.5, f"Row {self.first_row + i + 1}")
+            for c, desk in enumerate(row):
+                self._draw_desk(desk, label_width + (c + 0.5) * col_width, y + row_height / 2)
+
+        canv.setStrokeColor(GRID_LINE)
+        canv.setLineWidth(0.6)
+        canv.grid([0] + [label_width + c * col_width for c in range(self.cols + 1)],
+                  [i * row_height for i in range(len(self.seating) + 1)] + [self.height])
+
+    def _draw_desk(self, desk, x, y):
+        """Draw one desk's seats as centred lines around (x, y)"""
+        canv = self.canv
+        size, leading = self.font_size, self.leading
+        if not any(desk):
+            canv.setFillColor(EMPTY_GREY)
+            canv.setFont("Helvetica", size)
+            canv.drawCentredString(x, y - 0.35 * size, "Empty")
+            return
+        lines = len(desk) * self.lines_per_seat
+        baseline = y + (lines - 1) * leading / 2 - 0.35 * size
+        for s in desk:
+            if not s:
+                canv.setFillColor(EMPTY_GREY)
+                canv.setFont("Helvetica-Oblique", size)
+                canv.drawCentredString(x, baseline - (self.lines_per_seat - 1) * leading / 2, "Empty")
+                baseline -= self.lines_per_seat * leading
+                continue
+            roll = str(s['roll_no'])
+            label = f" ({s['class_name']}){' [LEET]' if s.get('is_leet', False) else ''}"
+            canv.setFillColor(CLASS_BLUE)
+            if self.lines_per_seat == 1:
+                roll_width = stringWidth(roll, "Helvetica-Bold", size)
+                left = x - (roll_width + stringWidth(label, "Helvetica", size)) / 2
+                canv.setFont("Helvetica-Bold", size)
+                canv.drawString(left, baseline, roll)
+                canv.setFont("Helvetica", size)
+                canv.drawString(left + roll_width, baseline, label)
+            else:
+                canv.setFont("Helvetica-Bold", size)
+                canv.drawCentredString(x, baseline, roll)
+                canv.setFont("Helvetica", size)
+                canv.drawCentredString(x, baseline - leading, label.strip())
+            baseline -= self.lines_per_seat * leading
+
+
+@dataclass
+class Students:
+    """Student columns (structure of arrays); entry i of every array describes one student.
+
+    Class names are stored once in class_names and looked up through class_id.
+    """
+    roll_no: np.ndarray
+    class_id: np.ndarray
+    position_in_class: np.ndarray
+    is_leet: np.ndarray
+    class_names: tuple = ()
+    
+    def __len__(self):
+        return len(self.roll_no)
+    
+    def __getitem__(self, index):
+        """Students at an index array or slice (slices are views)"""
+        return Students(self.roll_no[index], self.class_id[index], self.position_in_class[index],
+                        self.is_leet[index], self.class_names)
+    
+    def records(self):
+        """One dict per student, as the seating JSON and PDFs expect"""
+        names = self.class_names
+        return [{'roll_no': roll_no, 'class_name': names[class_id], 'class_id': class_id,
+                 'position_in_class': position, 'is_leet': is_leet}
+                for roll_no, class_id, position, is_leet in zip(self.roll_no.tolist(), self.class_id.tolist(),
+                                                               self.position_in_class.tolist(),
+                                                               self.is_leet.tolist())]
+
 
 class SeatingPlanner:
     def __init__(self):
         self.scaler = StandardScaler()
+    
+    def clear_roster_cache(self):
+        """Drop the memoized class rosters"""
+        _class_roster.cache_clear()
         
     def create_student_dataset(self, classes):
         """Create a dataset of all students with their class information, excluding TC students, including LEET students"""
-        students = []
+        roll_parts, leet_parts, id_parts, position_parts = [], [], [], []
+        # Small dense ids in class order, assigned once per class; unlike
+        # hash(name) % 1000 these never collide
+        class_ids = {}
         
         for cls in classes:
-            class_name = cls['name']
-            start_roll = int(cls['start_roll'])
-            end_roll = int(cls['end_roll'])
-            tc_students = cls.get('tc', '').strip()
-            leet_students = cls.get('leet', '').strip()
-            
-            # Parse TC (Transfer/Left) students
-            tc_list = []
-            if tc_students:
-                try:
-                    tc_list = [int(x.strip()) for x in tc_students.split(',') if x.strip().isdigit()]
-                except:
-                    tc_list = []
-            
-            # Parse LEET students
-            leet_list = []
-            if leet_students:
-                try:
-                    leet_list = [int(x.strip()) for x in leet_students.split(',') if x.strip().isdigit()]
-                except:
-                    leet_list = []
-            
-            # Generate regular student records, excluding TC students
-            position = 0
-            for roll_no in range(start_roll, end_roll + 1):
-                if roll_no not in tc_list:
-                    students.append({
-                        'roll_no': roll_no,
-                        'class_name': class_name,
-                        'class_id': hash(class_name) % 1000,
-                        'position_in_class': position,
-                        'is_leet': False
-                    })
-                    position += 1
-            
-            # Add LEET students
-            for roll_no in leet_list:
-                students.append({
-                    'roll_no': roll_no,
-                    'class_name': class_name,
-                    'class_id': hash(class_name) % 1000,
-                    'position_in_class': position,
-                    'is_leet': True
-                })
-                position += 1
+            roll_no, is_leet = _class_roster(int(cls['start_roll']), int(cls['end_roll']),
+                                             cls.get('tc', '').strip(), cls.get('leet', '').strip())
+            roll_parts.append(roll_no)
+            leet_parts.append(is_leet)
+            id_parts.append(np.full(len(roll_no), class_ids.setdefault(cls['name'], len(class_ids)),
+                                    dtype=np.int16))
+            position_parts.append(np.arange(len(roll_no)))
         
-        return pd.DataFrame(students)
-    
-    def can_place_student(self, seating_grid, row, col, seat_idx, student, rows, columns, students_per_desk):
-        """Check if student can be placed - ALL RULES ARE CRITICAL"""
-        student_class = student['class_name']
-        desk = seating_grid[row][col]
+        def column(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
         
+        return Students(
+            roll_no=column(roll_parts, np.int64),
+            class_id=column(id_parts, np.int16),
+            position_in_class=column(position_parts, np.int64),
+            is_leet=column(leet_parts, bool),
+            class_names=tuple(class_ids)
+        )
+    
+    def can_place_student(self, grid, row, col, seat_idx, class_id):
+        """Check if a class_id student can take grid[row, col, seat_idx] - ALL RULES ARE CRITICAL"""
         # CRITICAL RULE 1: Check same desk
-        for existing_student in desk:
-            if existing_student is not None and existing_student['class_name'] == student_class:
-                return False
+        if (grid[row, col] == class_id).any():
+            return False
         
         # CRITICAL RULE 2: Check horizontal neighbors
-        if seat_idx == 0 and col > 0:
-            left_desk = seating_grid[row][col - 1]
-            if left_desk and len(left_desk) > 0 and left_desk[-1] is not None:
-                if left_desk[-1]['class_name'] == student_class:
-                    return False
-        
-        if seat_idx == students_per_desk - 1 and col < columns - 1:
-            right_desk = seating_grid[row][col + 1]
-            if right_desk and len(right_desk) > 0 and right_desk[0] is not None:
-                if right_desk[0]['class_name'] == student_class:
-                    return False
+        if seat_idx == 0 and col > 0 and grid[row, col - 1, -1] == class_id:
+            return False
+        
+        if seat_idx == grid.shape[2] - 1 and col < grid.shape[1] - 1 and grid[row, col + 1, 0] == class_id:
+            return False
         
         return True
     
-    def get_last_class_in_column(self, seating_grid, row, col, rows):
-        """Get the class of the last placed student in this column"""
-        if row == 0:
-            return None
-        
-        prev_row = row - 1
-        if prev_row >= 0:
-            desk = seating_grid[prev_row][col]
-            for student in desk:
-                if student is not None:
-                    return student['class_name']
+    def arrange_with_constraints(self, students, rows, columns, students_per_desk):
+        """Seat a Students view in one hall; returns (nested seating lists, students placed)"""
+        if not students or len(students) == 0:
+            return [[[] for _ in range(columns)] for _ in range(rows)], 0
         
-        return None
+        _, seat_student, placed_count = self._arrange_grid(students, rows, columns, students_per_desk)
+        return self._decode_seating(students, seat_student), placed_count
     
-    def get_column_class_distribution(self, seating_grid, col, rows):
-        """Get the distribution of classes in a column"""
-        distribution = defaultdict(int)
-        for row in range(rows):
-            desk = seating_grid[row][col]
-            for student in desk:
-                if student is not None:
-                    distribution[student['class_name']] += 1
-        return distribution
+    def _decode_seating(self, students, seat_student):
+        """Nested rows -> desks -> student dicts (None = empty seat) from a seat_student array"""
+        records = students.records()
+        return [[[records[i] if i >= 0 else None for i in desk] for desk in row]
+                for row in seat_student.tolist()]
     
-    def find_best_column_for_class(self, seating_grid, row, student_class, columns, rows, students_per_desk):
-        """Find the best column to place a student from a given class"""
-        column_scores = []
-        
-        for col in range(columns):
-            desk = seating_grid[row][col]
-            empty_seats = sum(1 for s in desk if s is None)
-            if empty_seats == 0:
-                continue
-            
-            score = 0
-            
-            last_class = self.get_last_class_in_column(seating_grid, row, col, rows)
-            if last_class == student_class:
-                score += 1000
-            
-            distribution = self.get_column_class_distribution(seating_grid, col, rows)
-            class_count = distribution.get(student_class, 0)
-            score += class_count * 10
-            
-            column_scores.append((score, col))
+    def _arrange_halls(self, students, halls):
+        """Fill halls in order from students and arrange each one.
+
+        Returns one (hall, rows, columns, students_per_desk, hall_students,
+        grid, seat_student, placed_count) tuple per hall used. Halls are independent once the
+        students are split, so big jobs are arranged in the process pool.
+        """
+        parts = []
+        start = 0
+        for hall in halls:
+            if start == len(students):
+                break
+            rows = int(hall['rows'])
+            columns = int(hall['columns'])
+            students_per_desk = int(hall['students_per_desk'])
+            hall_students_count = min(len(students) - start, rows * columns * students_per_desk)
+            parts.append((hall, rows, columns, students_per_desk, students[start:start + hall_students_count]))
+            start += hall_students_count
         
-        if not column_scores:
-            return None
+        if len(parts) > 1 and len(students) >= PARALLEL_MIN_STUDENTS:
+            pool = _get_process_pool()
+            futures = [pool.submit(_arrange_hall, hall_students, rows, columns, students_per_desk)
+                       for _, rows, columns, students_per_desk, hall_students in parts]
+            grids = [future.result() for future in futures]
+        else:
+            grids = [self._arrange_grid(hall_students, rows, columns, students_per_desk)
+                     for _, rows, columns, students_per_desk, hall_students in parts]
         
-        column_scores.sort(key=lambda x: x[0])
-        return column_scores[0][1]
+        return [part + grid for part, grid in zip(parts, grids)]
     
-    def arrange_with_constraints(self, students, rows, columns, students_per_desk):
-        """Smart algorithm with STRONG vertical distribution"""
-        if not students or len(students) == 0:
-            return [[[] for _ in range(columns)] for _ in range(rows)]
-        
-        total_seats = rows * columns * students_per_desk
+    def _arrange_grid(self, students, rows, columns, students_per_desk):
+        """Smart algorithm with STRONG vertical distribution.
+
+        Returns (grid, seat_student, placed_count): two int arrays shaped (rows,
+        columns, students_per_desk), where grid holds each seat's class id and
+        seat_student the index into students (-1 = empty), and the number of
+        students seated.
+        """
         total_students = len(students)
         
-        seating_grid = [[[] for _ in range(columns)] for _ in range(rows)]
-        for row in range(rows):
-            for col in range(columns):
-                seating_grid[row][col] = [None] * students_per_desk
+        grid = np.full((rows, columns, students_per_desk), -1, dtype=np.int16)
+        seat_student = np.full((rows, columns, students_per_desk), -1, dtype=np.int32)
         
-        class_counts = defaultdict(int)
-        for student in students:
-            class_counts[student['class_name']] += 1
-        
-        class_names = list(class_counts.keys())
-        num_classes = len(class_names)
+        # Dense per-hall class ids
+        hall_classes, class_of = np.unique(students.class_id, return_inverse=True)
+        class_of = class_of.astype(np.int16)
+        num_classes = len(hall_classes)
         
         if num_classes == 1:
-            idx = 0
-            for row in range(rows):
-                for col in range(columns):
-                    for seat in range(students_per_desk):
-                        if idx < len(students):
-                            seating_grid[row][col][seat] = students[idx]
-                            idx += 1
-            return seating_grid
-        
-        class_groups = defaultdict(list)
-        for student in students:
-            class_groups[student['class_name']].append(student)
-        
-        for class_name in class_groups:
-            random.shuffle(class_groups[class_name])
+            grid.reshape(-1)[:total_students] = 0
+            seat_student.reshape(-1)[:total_students] = np.arange(total_students)
+            return grid, seat_student, total_students
+        
+        count = np.bincount(class_of, minlength=num_classes).astype(np.int32)
+        
+        # Easy instances need no search: group students by class and deal the groups into
+        # d columns of ceil(n / d), then read the table row by row into the seats, with
+        # d = max(students_per_desk, 2). A desk then takes one student from each column,
+        # so no class shorter than a column can repeat on it. Neighbours across a desk
+        # boundary sit (d - 1) * column - 1 apart in the table, which only a class filling
+        # a whole column can straddle when d == 2; dealing those first pins them to a column.
+        # Hall row r reads the columns rotated by r, so a seat and the seat in front of it
+        # come from different columns; unrotated, whole class groups would stack up the
+        # hall. A hall row of an odd number of single seats already alternates columns.
+        stride = max(students_per_desk, 2)
+        column_len = -(-total_students // stride)
+        if count.max() <= column_len:
+            class_order = np.random.permutation(num_classes)
+            class_order = class_order[np.argsort(count[class_order] < column_len, kind='stable')]
+            groups = [np.random.permutation(np.flatnonzero(class_of == cid)) for cid in class_order]
+            table = np.full(stride * column_len, -1, dtype=np.int32)
+            table[:total_students] = np.concatenate(groups)
+            dealt = table.reshape(stride, column_len).T
+            row_seats = columns * students_per_desk
+            if row_seats % stride == 0:
+                shift = np.arange(column_len) * stride // row_seats
+                dealt = dealt[np.arange(column_len)[:, None], (np.arange(stride) + shift[:, None]) % stride]
+            # With one seat per desk an odd hall can be one short; that last cell is always padding
+            order = dealt.reshape(-1)[:grid.size]
+            seat_student.reshape(-1)[:len(order)] = order
+            grid.reshape(-1)[:len(order)] = np.where(order >= 0, class_of[order], -1)
+            # Only a class straddling two columns can still put a classmate in front of a
+            # seat; leave those halls to the search, which keeps classmates apart vertically
+            if not ((grid[1:] == grid[:-1]) & (grid[1:] >= 0)).any():
+                return grid, seat_student, total_students
+            grid.fill(-1)
+            seat_student.fill(-1)
+        
+        # Per-class student queues, padded to one int32 row per class for the kernel
+        queues = np.full((num_classes, int(count.max())), -1, dtype=np.int32)
+        for cid in range(num_classes):
+            queues[cid, :count[cid]] = np.flatnonzero(class_of == cid)
+        head = np.zeros(num_classes, dtype=np.int32)
+        placed_stack = np.empty(total_students, dtype=np.int32)
         
         placed_count = 0
         max_retries = 8
+        jumped_from = None    # placed_count before the last backjump, if the last retry was one
         
         for attempt in range(max_retries):
             if placed_count == total_students:
                 break
             
-            if attempt > 0:
-                print(f"Retry attempt {attempt + 1}...")
-                seating_grid = [[[] for _ in range(columns)] for _ in range(rows)]
-                for row in range(rows):
-                    for col in range(columns):
-                        seating_grid[row][col] = [None] * students_per_desk
-                
-                class_groups = defaultdict(list)
-                shuffled_students = students.copy()
-                random.shuffle(shuffled_students)
-                for student in shuffled_students:
-                    class_groups[student['class_name']].append(student)
+            if attempt > 0 and (jumped_from is None or placed_count > jumped_from):
+                logger.debug("Retry attempt %d: backjumping...", attempt + 1)
+                jumped_from = placed_count
+                stranded = head < count
+                start_row = self._backjump(grid, seat_student, head, count, placed_stack, placed_count)
+                placed_count = int(np.searchsorted(placed_stack[:placed_count] // (columns * students_per_desk),
+                                                   start_row))
                 
+                # Redo those rows trying the stranded classes first (then the ones with the
+                # most students waiting), without the front-desk preference that kept them
+                # out of alternate rows
+                spread[start_row:] = False
+                rank = (~stranded * (total_students + 1) + (head - count)).astype(np.float64)
+                class_order[start_row:] = np.argsort(rank + np.random.random((rows - start_row, num_classes)),
+                                                     axis=1)
+            else:
+                if attempt > 0:
+                    logger.debug("Retry attempt %d...", attempt + 1)
+                    # Only the seats the last attempt filled need clearing; rewinding
+                    # head returns every student to its class queue
+                    placed = placed_stack[:placed_count]
+                    grid.reshape(-1)[placed] = -1
+                    seat_student.reshape(-1)[placed] = -1
+                jumped_from = None
+                start_row = 0
                 placed_count = 0
-            
-            for row in range(rows):
-                classes_to_place = []
-                for class_name in class_names:
-                    if len(class_groups[class_name]) > 0:
-                        classes_to_place.append(class_name)
-                
-                random.shuffle(classes_to_place)
                 
-                for col in range(columns):
-                    for seat_idx in range(students_per_desk):
-                        if placed_count >= total_students:
-                            break
-                        
-                        placed = False
-                        
-                        last_class_in_col = self.get_last_class_in_column(seating_grid, row, col, rows)
-                        
-                        preferred_classes = [c for c in classes_to_place 
-                                           if len(class_groups[c]) > 0 and c != last_class_in_col]
-                        
-                        if not preferred_classes:
-                            preferred_classes = [c for c in classes_to_place if len(class_groups[c]) > 0]
-                        
-                        for try_class in preferred_classes:
-                            if placed:
-                                break
-                            
-                            if len(class_groups[try_class]) > 0:
-                                for student_idx in range(min(len(class_groups[try_class]), 3)):
-                                    student = class_groups[try_class][student_idx]
-                                    
-                                    if self.can_place_student(seating_grid, row, col, seat_idx, 
-                                                             student, rows, columns, students_per_desk):
-                                        seating_grid[row][col][seat_idx] = student
-                                        class_groups[try_class].pop(student_idx)
-                                        placed_count += 1
-                                        placed = True
-                                        break
-                        
-                        if not placed:
-                            for try_class in class_names:
-                                if placed:
-                                    break
-                                if len(class_groups[try_class]) > 0:
-                                    for student_idx in range(len(class_groups[try_class])):
-                                        student = class_groups[try_class][student_idx]
-                                        
-                                        if self.can_place_student(seating_grid, row, col, seat_idx,
-                                                                 student, rows, columns, students_per_desk):
-                                            seating_grid[row][col][seat_idx] = student
-                                            class_groups[try_class].pop(student_idx)
-                                            placed_count += 1
-                                            placed = True
-                                            break
-        
-        print(f"Placement result: {placed_count}/{total_students} students placed")
+                # Randomness stays in Python; the kernel only follows these orders
+                for cid in range(num_classes):
+                    np.random.shuffle(queues[cid, :count[cid]])
+                head.fill(0)
+                # One shuffled class order per row, drawn in a single call
+                class_order = np.argsort(np.random.random((rows, num_classes)), axis=1).astype(np.int32)
+                spread = np.ones(rows, dtype=np.bool_)
+            
+            placed_count = _place_rows(grid, seat_student, queues, head, count, class_order, spread,
+                                       placed_stack, placed_count, start_row)
+        
+        logger.debug("Placement result: %d/%d students placed", placed_count, total_students)
         
         if placed_count < total_students:
-            print("Attempting backtracking for remaining students...")
             remaining_students = []
-            for class_name in class_names:
-                remaining_students.extend(class_groups[class_name])
+            for cid in range(num_classes):
+                remaining_students.extend(queues[cid, head[cid]:count[cid]].tolist())
             
-            if len(remaining_students) <= 15:
-                empty_positions = []
-                for row in range(rows):
-                    for col in range(columns):
-                        for seat_idx in range(students_per_desk):
-                            if seating_grid[row][col][seat_idx] is None:
-                                empty_positions.append((row, col, seat_idx))
-                
-                success = self.try_place_remaining(seating_grid, remaining_students, empty_positions,
-                                                   0, rows, columns, students_per_desk)
+            logger.debug("Matching remaining students to free seats...")
+            remaining_students = self.place_by_matching(grid, seat_student, class_of, remaining_students)
+            placed_count = total_students - len(remaining_students)
+            
+            if remaining_students:
+                logger.debug("Attempting backtracking for remaining students...")
+                success = self.try_place_remaining(grid, seat_student, class_of, remaining_students)
                 if success:
                     placed_count = total_students
-                    print("Backtracking successful!")
+                    logger.debug("Backtracking successful!")
         
-        return seating_grid
+        return grid, seat_student, placed_count
     
-    def try_place_remaining(self, seating_grid, students, empty_positions, student_idx, 
-                           rows, columns, students_per_desk):
-        """Helper method for backtracking remaining students"""
-        if student_idx >= len(students):
-            return True
+    def count_conflicts(self, grid):
+        """Number of seating-rule violations in a finished hall's class-id grid"""
+        rows, columns, students_per_desk = grid.shape
+        return int(_score_layout(grid.reshape(-1), rows, columns, students_per_desk))
+    
+    def _backjump(self, grid, seat_student, head, count, placed_stack, placed_count):
+        """Undo the rows implicated in a failed placement pass; returns the row to resume from.
+
+        A leftover student needs a desk with no classmate on it, so the conflict set is
+        the rows whose desks went entirely to the other classes. Back up to the latest
+        row from which the redone rows hold at least as many such desks as there are
+        leftovers. placed_stack is in row order, so the undone placements are a suffix
+        of it and are the last students each class consumed.
+        """
+        rows, columns, students_per_desk = grid.shape
+        seats = placed_stack[:placed_count]
+        seat_rows = seats // (columns * students_per_desk)
+        stuck = np.append(head < count, False)    # index -1 (empty seat) is never stuck
+        leftover = int((count - head).sum())
         
-        student = students[student_idx]
+        open_desks = ~stuck[grid].any(axis=2) & (grid >= 0).any(axis=2)
+        others = open_desks.sum(axis=1)
+        enough = np.flatnonzero(np.cumsum(others[::-1])[::-1] >= leftover)
+        start_row = int(enough[-1]) if len(enough) else 0
         
-        for pos_idx, (row, col, seat_idx) in enumerate(empty_positions):
-            if self.can_place_student(seating_grid, row, col, seat_idx, student, 
-                                     rows, columns, students_per_desk):
-                seating_grid[row][col][seat_idx] = student
-                
-                remaining_positions = empty_positions[:pos_idx] + empty_positions[pos_idx+1:]
-                if self.try_place_remaining(seating_grid, students, remaining_positions,
-                                          student_idx + 1, rows, columns, students_per_desk):
-                    return True
-                
-                seating_grid[row][col][seat_idx] = None
+        undone = seats[np.searchsorted(seat_rows, start_row):]
+        head -= np.bincount(grid.reshape(-1)[undone], minlength=len(head)).astype(head.dtype)
+        grid.reshape(-1)[undone] = -1
+        seat_student.reshape(-1)[undone] = -1
+        return start_row
+    
+    def _build_csr(self, grid, class_of, pending):
+        """Build the pending student -> free seat compatibility graph in CSR form.
+
+        Returns (indptr, indices, student_table, seat_table): student u may take the seats
+        indices[indptr[u]:indptr[u + 1]], student_table[u] is its index into class_of and
+        seat_table holds one (row, col, seat_idx) int32 triple per free seat.
+        """
+        rows, columns, students_per_desk = grid.shape
+        seat_table = np.argwhere(grid == -1).astype(np.int32).reshape(-1, 3)
+        student_table = np.asarray(pending, dtype=np.int32)
+        
+        class_index = {}
+        student_class = np.fromiter((class_index.setdefault(int(class_of[idx]), len(class_index))
+                                     for idx in student_table),
+                                    dtype=np.int32, count=len(student_table))
+        
+        # One bit per class, packed into uint64 words: bit k of a seat is set when
+        # a class-k student already shares its desk or sits across a desk boundary
+        forbidden = np.zeros((len(seat_table), (len(class_index) + 63) // 64), dtype=np.uint64)
+        cells = grid.tolist()
+        
+        def mark(seat_no, neighbour):
+            k = class_index.get(neighbour)
+            if k is not None:
+                forbidden[seat_no, k >> 6] |= np.uint64(1 << (k & 63))
+        
+        for seat_no, (row, col, seat_idx) in enumerate(seat_table.tolist()):
+            for neighbour in cells[row][col]:
+                mark(seat_no, neighbour)
+            if seat_idx == 0 and col > 0:
+                mark(seat_no, cells[row][col - 1][-1])
+            if seat_idx == students_per_desk - 1 and col < columns - 1:
+                mark(seat_no, cells[row][col + 1][0])
         
+        # Compatibility depends only on the class, so each class's seat list is computed once
+        compatible = [np.flatnonzero(((forbidden[:, k >> 6] >> np.uint64(k & 63)) & np.uint64(1)) == 0)
+                      .astype(np.int32)
+                      for k in range(len(class_index))]
+        
+        indptr = np.zeros(len(student_table) + 1, dtype=np.int32)
+        if len(student_table):
+            degree = np.array([len(seats) for seats in compatible], dtype=np.int32)
+            indptr[1:] = np.cumsum(degree[student_class])
+            indices = np.concatenate([compatible[k] for k in student_class])
+        else:
+            indices = np.empty(0, dtype=np.int32)
+        
+        return indptr, indices, student_table, seat_table
+    
+    def place_by_matching(self, grid, seat_student, class_of, pending):
+        """Seat leftover students via repeated maximum matchings; returns the students still unplaced"""
+        while pending:
+            indptr, indices, student_table, seat_table = self._build_csr(grid, class_of, pending)
+            pair_u = _hopcroft_karp(indptr, indices, len(seat_table))
+            
+            # Matched seats may neighbour each other, so re-check as each one is filled
+            unplaced = []
+            for idx, seat_no in zip(student_table.tolist(), pair_u):
+                if seat_no != -1:
+                    row, col, seat_idx = seat_table[seat_no].tolist()
+                    if self.can_place_student(grid, row, col, seat_idx, class_of[idx]):
+                        grid[row, col, seat_idx] = class_of[idx]
+                        seat_student[row, col, seat_idx] = idx
+                        continue
+                unplaced.append(idx)
+            
+            if len(unplaced) == len(pending):
+                break
+            pending = unplaced
+        
+        return pending
+    
+    def try_place_remaining(self, grid, seat_student, class_of, pending, max_nodes=50000):
+        """Backtracking search for the remaining students over the free seats.
+
+        Iterative (explicit stack), most-constrained class first (MRV), with forward
+        checking: each placement prunes the seats it rules out for the classes still
+        waiting, and a class left with fewer legal seats than students is a dead end.
+        Returns True when everyone is seated; otherwise the grid is left as it was.
+        """
+        columns, students_per_desk = grid.shape[1], grid.shape[2]
+        waiting = defaultdict(list)
+        for idx in pending:
+            waiting[int(class_of[idx])].append(idx)
+        
+        free = [tuple(pos) for pos in np.argwhere(grid == -1).tolist()]
+        legal = {k: {seat for seat in free if self.can_place_student(grid, *seat, k)} for k in waiting}
+        
+        def ruled_out(seat):
+            """Seats a student in seat takes away from its own class"""
+            row, col, seat_idx = seat
+            seats = [(row, col, k) for k in range(students_per_desk) if k != seat_idx]
+            if seat_idx == 0 and col > 0:
+                seats.append((row, col - 1, students_per_desk - 1))
+            if seat_idx == students_per_desk - 1 and col < columns - 1:
+                seats.append((row, col + 1, 0))
+            return seats
+        
+        def place(frame, seat):
+            k = frame['class']
+            idx = waiting[k].pop()
+            grid[seat] = k
+            seat_student[seat] = idx
+            removed = [(j, seat) for j in legal if seat in legal[j]]
+            removed += [(k, other) for other in ruled_out(seat) if other in legal[k]]
+            for j, other in removed:
+                legal[j].discard(other)
+            frame['placed'] = (seat, idx, removed)
+            # Forward check: every waiting class still needs enough legal seats
+            return all(len(legal[j]) >= len(waiting[j]) for j in waiting)
+        
+        def unplace(frame):
+            seat, idx, removed = frame['placed']
+            for j, other in removed:
+                legal[j].add(other)
+            grid[seat] = -1
+            seat_student[seat] = -1
+            waiting[frame['class']].append(idx)
+            frame['placed'] = None
+        
+        def next_frame():
+            classes = [k for k in waiting if waiting[k]]
+            if not classes:
+                return None
+            k = min(classes, key=lambda j: len(legal[j]))
+            return {'class': k, 'candidates': sorted(legal[k]), 'next': 0, 'placed': None}
+        
+        frame = next_frame()
+        if frame is None:
+            return True
+        stack = [frame]
+        nodes = 0
+        
+        while stack and nodes < max_nodes:
+            frame = stack[-1]
+            if frame['placed'] is not None:
+                unplace(frame)
+            
+            advanced = False
+            while frame['next'] < len(frame['candidates']):
+                seat = frame['candidates'][frame['next']]
+                frame['next'] += 1
+                nodes += 1
+                if place(frame, seat):
+                    advanced = True
+                    break
+                unplace(frame)
+            
+            if not advanced:
+                stack.pop()
+                continue
+            
+            child = next_frame()
+            if child is None:
+                return True
+            stack.append(child)
+        
+        # Out of options or over budget: undo whatever is still placed
+        while stack:
+            frame = stack.pop()
+            if frame['placed'] is not None:
+                unplace(frame)
         return False
     
     def generate_arrangement(self, classes, halls):
         """Generate the complete seating arrangement"""
         try:
-            students_df = self.create_student_dataset(classes)
+            students = self.create_student_dataset(classes)
             
-            total_students = len(students_df)
+            total_students = len(students)
             total_capacity = sum(int(h['rows']) * int(h['columns']) * int(h['students_per_desk']) 
                                for h in halls)
             
@@ -324,7 +1255,7 @@ class SeatingPlanner:
             if total_students > total_capacity:
                 return {'error': f'Not enough capacity! Students: {total_students}, Capacity: {total_capacity}'}
             
-            students_df = students_df.sample(frac=1).reset_index(drop=True)
+            students = students[np.random.permutation(total_students)]
             
             result = {
                 'halls': [],
@@ -335,32 +1266,23 @@ class SeatingPlanner:
                 }
             }
             
-            student_pool = students_df.to_dict('records')
+            start = 0    # students[:start] are already seated
             halls_used = 0
             
-            for hall in halls:
-                if not student_pool:
-                    break
-                
+            for hall, rows, columns, students_per_desk, hall_students, grid, seat_student, occupied in \
+                    self._arrange_halls(students, halls):
                 halls_used += 1
                 hall_name = hall['name']
-                rows = int(hall['rows'])
-                columns = int(hall['columns'])
-                students_per_desk = int(hall['students_per_desk'])
                 hall_capacity = rows * columns * students_per_desk
                 
-                hall_students_count = min(len(student_pool), hall_capacity)
-                hall_students = student_pool[:hall_students_count]
-                
-                print(f"\n=== Arranging {hall_name}: {len(hall_students)} students ===")
+                logger.info("Arranging %s: %d students", hall_name, len(hall_students))
                 
-                seating_grid = self.arrange_with_constraints(
-                    hall_students, rows, columns, students_per_desk
-                )
+                seating_grid = self._decode_seating(hall_students, seat_student)
                 
-                occupied = sum(1 for row in seating_grid for desk in row for student in desk if student)
-                
-                print(f"Result: {occupied}/{len(hall_students)} students placed")
+                logger.info("Result: %d/%d students placed", occupied, len(hall_students))
+                conflicts = self.count_conflicts(grid)
+                if conflicts:
+                    logger.warning("%d seating rule conflicts in %s", conflicts, hall_name)
                 
                 if occupied != len(hall_students):
                     unplaced = len(hall_students) - occupied
@@ -374,7 +1296,7 @@ class SeatingPlanner:
                                 f'5. Distribute students across more halls (smaller groups per hall work better)'
                     }
                 
-                student_pool = student_pool[hall_students_count:]
+                start += len(hall_students)
                 
                 result['halls'].append({
                     'name': hall_name,
@@ -388,16 +1310,15 @@ class SeatingPlanner:
             
             result['summary']['halls_used'] = halls_used
             
-            if student_pool:
+            if start < total_students:
                 return {
-                    'error': f'Could not place {len(student_pool)} students. Please add more halls or increase capacity.'
+                    'error': f'Could not place {total_students - start} students. Please add more halls or increase capacity.'
                 }
             
             return result
             
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error generating arrangement")
             return {'error': f'Error generating arrangement: {str(e)}'}
     
     def generate_combined_seating_for_slot(self, exam_classes, classes, halls):
@@ -406,52 +1327,43 @@ class SeatingPlanner:
         if not exam_class_list:
             return None
         
-        students_df = self.create_student_dataset(exam_class_list)
-        if len(students_df) == 0:
+        students = self.create_student_dataset(exam_class_list)
+        total_students = len(students)
+        if total_students == 0:
             return None
         
-        students_df = students_df.sample(frac=1).reset_index(drop=True)
-        student_pool = students_df.to_dict('records')
+        students = students[np.random.permutation(total_students)]
         
-        print(f"\n=== Generating Combined Seating for {len(exam_classes)} classes: {', '.join(exam_classes)} ===")
-        print(f"Total students: {len(student_pool)}")
+        logger.info("Generating combined seating for %d classes: %s", len(exam_classes), ', '.join(exam_classes))
+        logger.info("Total students: %d", total_students)
         
         exam_seating = []
         
-        for hall in halls:
-            if not student_pool:
-                break
-            
+        for hall, rows, columns, students_per_desk, hall_students, grid, seat_student, occupied in \
+                self._arrange_halls(students, halls):
             hall_name = hall['name']
-            rows = int(hall['rows'])
-            columns = int(hall['columns'])
-            students_per_desk = int(hall['students_per_desk'])
-            hall_capacity = rows * columns * students_per_desk
-            
-            hall_students_count = min(len(student_pool), hall_capacity)
-            hall_students = student_pool[:hall_students_count]
             
-            print(f"Arranging {len(hall_students)} students in {hall_name}")
+            logger.info("Arranging %d students in %s", len(hall_students), hall_name)
             
-            seating_grid = self.arrange_with_constraints(
-                hall_students, rows, columns, students_per_desk
-            )
+            seating_grid = self._decode_seating(hall_students, seat_student)
             
-            occupied = sum(1 for row in seating_grid for desk in row for student in desk if student)
+            conflicts = self.count_conflicts(grid)
+            if conflicts:
+                logger.warning("%d seating rule conflicts in %s", conflicts, hall_name)
             
-            student_pool = student_pool[hall_students_count:]
-            
-            exam_seating.append({
+            hall_seating = {
                 'hall_name': hall_name,
                 'rows': rows,
                 'columns': columns,
                 'students_per_desk': students_per_desk,
                 'seating': seating_grid,
                 'occupied': occupied
-            })
-            
-            if not student_pool:
-                break
+            }
+            # Fingerprint for the exam schedule PDF, which draws a repeated hall seating only once
+            hall_seating['_hash'] = hashlib.blake2b(
+                orjson.dumps(hall_seating, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+                digest_size=12).hexdigest()
+            exam_seating.append(hall_seating)
         
         return exam_seating
     
@@ -477,8 +1389,12 @@ class SeatingPlanner:
             if date_mode == 'manual':
                 exam_dates = self.assign_manual_dates(subject_schedule, manual_dates)
             else:
-                exam_dates = self.auto_generate_dates(subject_schedule, start_date, end_date, 
-                                                     exams_per_day, classes)
+                exam_dates = self.solve_exam_dates(subject_schedule, start_date, end_date,
+                                                   exams_per_day, classes, halls)
+                if exam_dates is None:
+                    logger.warning("No slot assignment fits the date range and hall capacity, using greedy dates")
+                    exam_dates = self.auto_generate_dates(subject_schedule, start_date, end_date, 
+                                                         exams_per_day, classes)
             
             # Group exams by date and shift (time slot)
             exams_by_slot = defaultdict(list)
@@ -486,11 +1402,16 @@ class SeatingPlanner:
                 slot_key = f"{exam['date']}_{exam['shift']}"
                 exams_by_slot[slot_key].append(exam)
             
-            # Generate SINGLE combined seating for each time slot
+            # Generate SINGLE combined seating for each time slot. Slots sitting the same set of
+            # classes share one arrangement; it is only read from here on
             slot_seating = {}
+            seating_cache = {}
             for slot_key, slot_exams in exams_by_slot.items():
                 exam_classes = list(set(exam['class_name'] for exam in slot_exams))
-                combined_seating = self.generate_combined_seating_for_slot(exam_classes, classes, halls)
+                class_set = frozenset(exam_classes)
+                if class_set not in seating_cache:
+                    seating_cache[class_set] = self.generate_combined_seating_for_slot(exam_classes, classes, halls)
+                combined_seating = seating_cache[class_set]
                 slot_seating[slot_key] = {
                     'seating': combined_seating,
                     'exam_classes': exam_classes
@@ -498,11 +1419,13 @@ class SeatingPlanner:
             
             # Assign halls and invigilators ensuring one teacher per hall per slot
             schedule_with_assignments = self.assign_halls_and_invigilators_smart(
-                exam_dates, slot_seating, halls, teachers, invigilators_per_hall
+                exam_dates, slot_seating, halls, teachers, invigilators_per_hall, exams_by_slot
             )
             
+            # Seating is stored once per slot; exams refer to it through their slot_key
             return {
                 'exam_schedule': schedule_with_assignments,
+                'slot_seating': slot_seating,
                 'summary': {
                     'total_exams': len(subject_schedule),
                     'total_days': len(set(e['date'] for e in schedule_with_assignments)),
@@ -512,8 +1435,7 @@ class SeatingPlanner:
             }
             
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error generating exam schedule")
             return {'error': f'Error generating exam schedule: {str(e)}'}
     
     def assign_manual_dates(self, subject_schedule, manual_dates):
@@ -533,10 +1455,63 @@ class SeatingPlanner:
             })
         return exam_dates
     
+    def solve_exam_dates(self, subject_schedule, start_date, end_date, exams_per_day, classes, halls):
+        """Assign exams to date/shift slots as a CSP: one exam per class per slot, and every
+        slot's combined students must fit in the halls. Returns None if no assignment exists"""
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        shifts = ['Morning'] if exams_per_day == 1 else ['Morning', 'Evening']
+        
+        slots = []
+        current_date = start
+        while current_date <= end:
+            for shift in shifts:
+                slots.append((current_date.strftime('%Y-%m-%d'), shift))
+            current_date += timedelta(days=1)
+        
+        class_sizes = {
+            cls['name']: len(_class_roster(int(cls['start_roll']), int(cls['end_roll']),
+                                           cls.get('tc', '').strip(), cls.get('leet', '').strip())[0])
+            for cls in classes
+        }
+        capacity = sum(int(h['rows']) * int(h['columns']) * int(h['students_per_desk']) for h in halls)
+        
+        exams_by_class = defaultdict(list)
+        for idx, exam in enumerate(subject_schedule):
+            exams_by_class[exam['class_name']].append(idx)
+        neighbours = [set(exams_by_class[exam['class_name']]) - {idx}
+                      for idx, exam in enumerate(subject_schedule)]
+        loads = [class_sizes.get(exam['class_name'], 0) for exam in subject_schedule]
+        domains = [range(len(slots))] * len(subject_schedule)
+        
+        # Plainly infeasible ranges would otherwise run the search to its step limit first
+        if (max((len(idxs) for idxs in exams_by_class.values()), default=0) > len(slots)
+                or sum(loads) > capacity * len(slots)):
+            return None
+        
+        # The CSP search settles typical instances in milliseconds, trying slots earliest
+        # first; CP-SAT only takes over the rare ones it gives up on
+        assignment = _solve_csp(domains, neighbours, loads, capacity)
+        if assignment is False:
+            assignment = _solve_cp_sat(domains, neighbours, loads, capacity) if cp_model is not None else None
+        if assignment is None:
+            return None
+        
+        exam_dates = []
+        for idx in sorted(range(len(subject_schedule)), key=lambda k: assignment[k]):
+            exam = subject_schedule[idx]
+            date, shift = slots[assignment[idx]]
+            exam_dates.append({
+                'class_name': exam['class_name'],
+                'subject_name': exam['subject_name'],
+                'difficulty': exam['difficulty'],
+                'date': date,
+                'shift': shift
+            })
+        return exam_dates
+    
     def auto_generate_dates(self, subject_schedule, start_date, end_date, exams_per_day, classes):
         """Auto-generate exam dates with shifts ensuring no class has multiple exams in same shift"""
-        from datetime import datetime, timedelta
-        
         start = datetime.strptime(start_date, '%Y-%m-%d')
         end = datetime.strptime(end_date, '%Y-%m-%d')
         
@@ -546,16 +1521,20 @@ class SeatingPlanner:
         current_date = start
         shift_idx = 0
         
-        remaining_exams = subject_schedule.copy()
-        classes_scheduled_in_slot = set()
+        # Pending exams of each class, in schedule order. Every slot takes the next exam of
+        # each class that still has one, so no class sits two exams in the same slot
+        pending_by_class = defaultdict(deque)
+        for idx, exam in enumerate(subject_schedule):
+            pending_by_class[exam['class_name']].append((idx, exam))
         
-        while remaining_exams and current_date <= end:
+        while pending_by_class and current_date <= end:
             current_shift = shifts[shift_idx]
-            scheduled_this_iteration = False
             
-            for exam in remaining_exams[:]:
-                if exam['class_name'] in classes_scheduled_in_slot:
-                    continue
+            # Classes in the order their next exams appear in the schedule
+            for class_name, pending in sorted(pending_by_class.items(), key=lambda item: item[1][0][0]):
+                _, exam = pending.popleft()
+                if not pending:
+                    del pending_by_class[class_name]
                 
                 exam_dates.append({
                     'class_name': exam['class_name'],
@@ -564,36 +1543,35 @@ class SeatingPlanner:
                     'date': current_date.strftime('%Y-%m-%d'),
                     'shift': current_shift
                 })
-                
-                classes_scheduled_in_slot.add(exam['class_name'])
-                remaining_exams.remove(exam)
-                scheduled_this_iteration = True
-                
-                if len(classes_scheduled_in_slot) >= len(set(e['class_name'] for e in subject_schedule)):
-                    break
             
             # Move to next shift or day
             shift_idx += 1
             if shift_idx >= len(shifts):
                 shift_idx = 0
                 current_date += timedelta(days=1)
-                classes_scheduled_in_slot = set()
-            else:
-                classes_scheduled_in_slot = set()
         
         return exam_dates
     
-    def assign_halls_and_invigilators_smart(self, exam_dates, slot_seating, halls, teachers, invigilators_per_hall):
-        """Assign halls and invigilators ensuring ONE teacher per hall per time slot"""
+    def assign_halls_and_invigilators_smart(self, exam_dates, slot_seating, halls, teachers, invigilators_per_hall,
+                                            exams_by_slot=None):
+        """Assign halls and invigilators ensuring ONE teacher per hall per time slot.
+
+        exams_by_slot maps "date_shift" to that slot's exams; it is rebuilt from
+        exam_dates when the caller has not grouped them already.
+        """
         teacher_subjects = {}
         for teacher in teachers:
             teacher_subjects[teacher['name']] = teacher['subject']
+        teacher_names = [t['name'] for t in teachers]
+        teachers_by_subject = defaultdict(set)
+        for name, subject in teacher_subjects.items():
+            teachers_by_subject[subject].add(name)
         
-        # Group exams by date and shift
-        exams_by_slot = defaultdict(list)
-        for exam in exam_dates:
-            slot_key = f"{exam['date']}_{exam['shift']}"
-            exams_by_slot[slot_key].append(exam)
+        if exams_by_slot is None:
+            exams_by_slot = defaultdict(list)
+            for exam in exam_dates:
+                slot_key = f"{exam['date']}_{exam['shift']}"
+                exams_by_slot[slot_key].append(exam)
         
         schedule_with_assignments = []
         
@@ -609,10 +1587,8 @@ class SeatingPlanner:
             slot_subjects = set(exam['subject_name'] for exam in slot_exams)
             
             # Find teachers who don't teach any of the subjects in this slot
-            eligible_teachers = [
-                t['name'] for t in teachers 
-                if teacher_subjects.get(t['name'], '') not in slot_subjects
-            ]
+            busy_teachers = set().union(*(teachers_by_subject[s] for s in slot_subjects if s in teachers_by_subject))
+            eligible_teachers = [name for name in teacher_names if name not in busy_teachers]
             
             # Assign teachers to halls (one teacher can only be in one hall)
             halls_with_students = [h for h in combined_seating if h['occupied'] > 0] if combined_seating else []
@@ -647,31 +1623,23 @@ class SeatingPlanner:
                     'hall_name': assigned_hall,
                     'hall_capacity': halls_with_students[0]['occupied'] if halls_with_students else 0,
                     'invigilators': assigned_invigilators,
-                    'seating_arrangement': combined_seating,
                     'exam_classes_in_slot': exam_classes,
                     'slot_key': slot_key
                 })
         
         return schedule_with_assignments
     
-    def generate_pdf(self, arrangement):
-        """Generate seating arrangement PDF"""
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.pagesizes import landscape, A4
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from datetime import datetime
-
+    def generate_pdf(self, arrangement, stream=None):
+        """Generate seating arrangement PDF into stream (a new BytesIO by default), rewound for reading"""
         LEFT_MARGIN = RIGHT_MARGIN = TOP_MARGIN = BOTTOM_MARGIN = 36
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_path = f"output/seating_arrangement_{timestamp}.pdf"
+        if stream is None:
+            stream = io.BytesIO()
 
         page_width, _ = landscape(A4)
         usable_width = page_width - (LEFT_MARGIN + RIGHT_MARGIN)
 
         doc = SimpleDocTemplate(
-            pdf_path,
+            stream,
             pagesize=landscape(A4),
             rightMargin=RIGHT_MARGIN,
             leftMargin=LEFT_MARGIN,
@@ -680,30 +1648,10 @@ class SeatingPlanner:
         )
 
         elements = []
-        styles = getSampleStyleSheet()
-
-        title_style = ParagraphStyle(
-            'Title',
-            fontSize=30,
-            leading=38,
-            textColor=colors.HexColor("#0d47a1"),
-            alignment=1,
-            fontName="Helvetica-Bold",
-            spaceAfter=12
-        )
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            fontSize=15,
-            leading=22,
-            textColor=colors.HexColor("#283593"),
-            alignment=1,
-            fontName="Helvetica-Bold",
-            spaceAfter=35
-        )
 
-        elements.append(Paragraph("Examination Seating Arrangement", title_style))
+        elements.append(Paragraph("Examination Seating Arrangement", SEATING_TITLE_STYLE))
         elements.append(Spacer(1, 0.15 * inch))
-        elements.append(Paragraph("AI-Generated Hall-wise Seating Layout", subtitle_style))
+        elements.append(Paragraph("AI-Generated Hall-wise Seating Layout", SEATING_SUBTITLE_STYLE))
         elements.append(Spacer(1, 0.25 * inch))
 
         summary = arrangement.get("summary", {})
@@ -714,27 +1662,36 @@ class SeatingPlanner:
             ["Generated On", datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
         ]
         summary_table = Table(summary_data, colWidths=[usable_width / 4, usable_width / 4])
-        summary_table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#e3f2fd")),
-            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-            ("FONTSIZE", (0, 0), (-1, -1), 11),
-            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#90caf9")),
-            ("LEFTPADDING", (0, 0), (-1, -1), 10),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-            ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-        ]))
+        summary_table.setStyle(SEATING_SUMMARY_TABLE_STYLE)
         elements.append(summary_table)
         elements.append(Spacer(1, 0.4 * inch))
 
-        row_label_style = ParagraphStyle('RowLabel', fontSize=10, leading=13, alignment=1, fontName="Helvetica-Bold")
-        cell_style = ParagraphStyle('Cell', fontSize=10, leading=13, alignment=1)
-        class_style = ParagraphStyle('ClassCell', fontSize=10, leading=13, alignment=1, textColor=colors.HexColor("#1e88e5"))
-        empty_style = ParagraphStyle('EmptyCell', fontSize=10, leading=13, alignment=1, textColor=colors.HexColor("#9e9e9e"))
+        # Cells that repeat across tables are built once per document and shared; a Table
+        # re-wraps every cell just before drawing it. Not module level, as PDFs build on threads
+        halls = arrangement.get("halls", [])
+        max_rows = max((len(hall["seating"]) for hall in halls), default=0)
+        max_cols = max((len(hall["seating"][0]) for hall in halls if hall["seating"]), default=0)
+        row_labels = [Paragraph(f"Row {r + 1}", ROW_LABEL_STYLE) for r in range(max_rows)]
+        col_headers = [""] + [f"Col {c + 1}" for c in range(max_cols)]
+        empty_desk = Paragraph("Empty", EMPTY_STYLE)
 
-        for hall in arrangement.get("halls", []):
+        def desk_cell(desk, text_width):
+            # Seats hold a student dict or None, so any() spots an occupied desk in C
+            if not any(desk):
+                return empty_desk
+            if len(desk) == 1:
+                # A lone student needs no mixed markup, so a plain string styled by the table
+                # skips the Paragraph parse, as long as it fits without wrapping
+                s = desk[0]
+                text = f"{s['roll_no']} ({s['class_name']}){' [LEET]' if s.get('is_leet', False) else ''}"
+                if stringWidth(text, "Helvetica-Bold", 10) <= text_width:
+                    return text
+            return Paragraph(" | ".join(
+                f"<b>{s['roll_no']}</b> (<font color='#1e88e5'>{s['class_name']}</font>){' [LEET]' if s.get('is_leet', False) else ''}"
+                if s else "<font color='#9e9e9e'><i>Empty</i></font>"
+                for s in desk), CLASS_STYLE)
+
+        for hall in halls:
             hall_name = hall["name"]
             seating = hall["seating"]
             rows = len(seating)
@@ -742,141 +1699,49 @@ class SeatingPlanner:
 
             hall_banner = Table([[f"{hall_name} – Capacity: {hall['capacity']} | Occupied: {hall['occupied']}"]],
                                 colWidths=[usable_width])
-            hall_banner.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#1565c0")),
-                ("TEXTCOLOR", (0, 0), (-1, -1), colors.whitesmoke),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, -1), 14),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("TOPPADDING", (0, 0), (-1, -1), 8),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-            ]))
+            hall_banner.setStyle(HALL_BANNER_TABLE_STYLE)
             elements.append(hall_banner)
             elements.append(Spacer(1, 0.2 * inch))
 
-            table_data = [[""] + [f"Col {i + 1}" for i in range(cols)]]
-
-            for r_idx, row in enumerate(seating):
-                row_cells = [Paragraph(f"Row {r_idx + 1}", row_label_style)]
-                for desk in row:
-                    if all(s is None for s in desk):
-                        row_cells.append(Paragraph("Empty", empty_style))
-                        continue
-
-                    parts = []
-                    for student in desk:
-                        if student:
-                            leet_marker = " [LEET]" if student.get("is_leet", False) else ""
-                            parts.append(f"<b>{student['roll_no']}</b> (<font color='#1e88e5'>{student['class_name']}</font>){leet_marker}")
-                        else:
-                            parts.append("<font color='#9e9e9e'><i>Empty</i></font>")
-                    row_cells.append(Paragraph(" | ".join(parts), class_style))
-                table_data.append(row_cells)
-
             row_label_col = 1.0 * inch
             per_col = max((usable_width - row_label_col) / max(cols, 1), 1.4 * inch)
             if (row_label_col + per_col * cols) > usable_width:
                 per_col = (usable_width - row_label_col) / max(cols, 1)
-            col_widths = [row_label_col] + [per_col] * cols
-
-            seating_table = Table(table_data, colWidths=col_widths, repeatRows=1)
-
-            style = [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0d47a1")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 11),
-                ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
-                ("TOPPADDING", (0, 0), (-1, 0), 10),
-
-                ("BACKGROUND", (0, 1), (0, -1), colors.HexColor("#e3f2fd")),
-                ("TEXTCOLOR", (0, 1), (0, -1), colors.HexColor("#0d47a1")),
-                ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
-                ("ALIGN", (0, 1), (0, -1), "CENTER"),
-
-                ("GRID", (0, 0), (-1, -1), 0.6, colors.HexColor("#90caf9")),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                ("TOPPADDING", (1, 1), (-1, -1), 8),
-                ("BOTTOMPADDING", (1, 1), (-1, -1), 8),
-                ("FONTSIZE", (1, 1), (-1, -1), 10),
-            ]
-
-            for i in range(1, len(table_data)):
-                bg_color = colors.HexColor("#f8fbff") if i % 2 == 0 else colors.white
-                style.append(("BACKGROUND", (1, i), (-1, i), bg_color))
-
-            seating_table.setStyle(TableStyle(style))
-            elements.append(seating_table)
+
+            if rows * cols > SEATING_GRID_MIN_DESKS:
+                elements.append(SeatingGrid(seating, row_label_col, per_col))
+            else:
+                text_width = per_col - 20    # less SEATING_TABLE_STYLE's side padding
+                table_data = [col_headers[:cols + 1]] + [[row_labels[r_idx]] + [desk_cell(desk, text_width)
+                                                                                for desk in row]
+                                                         for r_idx, row in enumerate(seating)]
+                col_widths = [row_label_col] + [per_col] * cols
+
+                seating_table = Table(table_data, colWidths=col_widths, repeatRows=1)
+
+                seating_table.setStyle(SEATING_TABLE_STYLE)
+                elements.append(seating_table)
             elements.append(Spacer(1, 0.4 * inch))
             elements.append(PageBreak())
 
         doc.build(elements)
-        return pdf_path
+        stream.seek(0)
+        return stream
     
-    def generate_exam_schedule_pdf(self, exam_schedule_data):
-        """Generate comprehensive exam schedule PDF with ONE seating arrangement per time slot"""
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.pagesizes import landscape, A4
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from datetime import datetime
-        from collections import defaultdict
+    def generate_exam_schedule_pdf(self, exam_schedule_data, stream=None):
+        """Generate comprehensive exam schedule PDF with ONE seating arrangement per time slot.
+        Written into stream (a new BytesIO by default), rewound for reading"""
+        if stream is None:
+            stream = io.BytesIO()
 
-        LEFT_MARGIN = RIGHT_MARGIN = TOP_MARGIN = BOTTOM_MARGIN = 36
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_path = f"output/exam_schedule_{timestamp}.pdf"
-
-        page_width, _ = landscape(A4)
-        usable_width = page_width - (LEFT_MARGIN + RIGHT_MARGIN)
-
-        doc = SimpleDocTemplate(
-            pdf_path,
-            pagesize=landscape(A4),
-            rightMargin=RIGHT_MARGIN,
-            leftMargin=LEFT_MARGIN,
-            topMargin=TOP_MARGIN,
-            bottomMargin=BOTTOM_MARGIN
-        )
+        doc, usable_width = self._schedule_doc_template(stream)
 
         elements = []
 
-        title_style = ParagraphStyle(
-            'Title',
-            fontSize=32,
-            leading=40,
-            textColor=colors.HexColor("#0d47a1"),
-            alignment=1,
-            fontName="Helvetica-Bold",
-            spaceAfter=15
-        )
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            fontSize=16,
-            leading=24,
-            textColor=colors.HexColor("#283593"),
-            alignment=1,
-            fontName="Helvetica-Bold",
-            spaceAfter=30
-        )
-        section_style = ParagraphStyle(
-            'Section',
-            fontSize=20,
-            leading=28,
-            textColor=colors.HexColor("#1565c0"),
-            alignment=1,
-            fontName="Helvetica-Bold",
-            spaceAfter=20
-        )
-
         # Title Page
-        elements.append(Paragraph("Examination Schedule", title_style))
+        elements.append(Paragraph("Examination Schedule", SCHEDULE_TITLE_STYLE))
         elements.append(Spacer(1, 0.2 * inch))
-        elements.append(Paragraph("Complete Datesheet & Seating Plan with Invigilators", subtitle_style))
+        elements.append(Paragraph("Complete Datesheet & Seating Plan with Invigilators", SCHEDULE_SUBTITLE_STYLE))
         elements.append(Spacer(1, 0.4 * inch))
 
         # Summary
@@ -889,44 +1754,36 @@ class SeatingPlanner:
             ["Generated On", datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
         ]
         summary_table = Table(summary_data, colWidths=[usable_width / 3, usable_width / 3])
-        summary_table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#e3f2fd")),
-            ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-            ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, -1), 12),
-            ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#90caf9")),
-            ("LEFTPADDING", (0, 0), (-1, -1), 12),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 12),
-            ("TOPPADDING", (0, 0), (-1, -1), 8),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-        ]))
+        summary_table.setStyle(SCHEDULE_SUMMARY_TABLE_STYLE)
         elements.append(summary_table)
         elements.append(Spacer(1, 0.5 * inch))
         elements.append(PageBreak())
 
         # Datesheet Section
-        elements.append(Paragraph("Examination Datesheet", section_style))
+        elements.append(Paragraph("Examination Datesheet", SECTION_STYLE))
         elements.append(Spacer(1, 0.3 * inch))
 
-        schedule = exam_schedule_data.get("exam_schedule", [])
-        
-        # Group by slot
-        exams_by_slot = defaultdict(list)
+        # Fill in optional exam fields once, on copies so the caller's schedule is untouched
+        schedule = [{'shift': 'Morning', 'difficulty': 1, 'invigilators': (), **exam}
+                    for exam in exam_schedule_data.get("exam_schedule", [])]
         for exam in schedule:
-            slot_key = exam.get('slot_key', f"{exam['date']}_{exam.get('shift', 'Morning')}")
-            exams_by_slot[slot_key].append(exam)
+            if not exam.get('slot_key'):
+                exam['slot_key'] = f"{exam['date']}_{exam['shift']}"
+        slot_seating = exam_schedule_data.get("slot_seating", {})
+        
+        # Group by slot: a stable sort on the slot key, then runs of equal keys
+        by_slot = itemgetter('slot_key')
+        slot_items = [(slot_key, list(group)) for slot_key, group in groupby(sorted(schedule, key=by_slot), key=by_slot)]
 
         datesheet_data = [["Date", "Shift", "Class", "Subject", "Hall", "Difficulty", "Invigilators"]]
         
-        for slot_key in sorted(exams_by_slot.keys()):
-            exams = exams_by_slot[slot_key]
+        for slot_key, exams in slot_items:
             for exam in exams:
-                invigilators_str = ", ".join(exam.get('invigilators', []))
-                difficulty_stars = "★" * exam.get('difficulty', 1)
+                invigilators_str = ", ".join(exam['invigilators'])
+                difficulty_stars = STARS[max(0, min(exam['difficulty'], 10))]
                 datesheet_data.append([
                     exam['date'],
-                    exam.get('shift', 'Morning'),
+                    exam['shift'],
                     exam['class_name'],
                     exam['subject_name'],
                     exam['hall_name'],
@@ -937,62 +1794,127 @@ class SeatingPlanner:
         col_widths = [1.0*inch, 0.8*inch, 0.9*inch, 1.2*inch, 0.9*inch, 0.7*inch, 2.3*inch]
         datesheet_table = Table(datesheet_data, colWidths=col_widths, repeatRows=1)
         
-        datesheet_style = [
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1565c0")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, 0), 10),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#90caf9")),
-            ("LEFTPADDING", (0, 0), (-1, -1), 6),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 6),
-            ("TOPPADDING", (0, 0), (-1, -1), 6),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-            ("FONTSIZE", (0, 1), (-1, -1), 9),
-        ]
-        
-        for i in range(1, len(datesheet_data)):
-            bg_color = colors.HexColor("#f0f8ff") if i % 2 == 0 else colors.white
-            datesheet_style.append(("BACKGROUND", (0, i), (-1, i), bg_color))
-        
-        datesheet_table.setStyle(TableStyle(datesheet_style))
+        datesheet_table.setStyle(DATESHEET_TABLE_STYLE)
         elements.append(datesheet_table)
         elements.append(Spacer(1, 0.5 * inch))
         elements.append(PageBreak())
 
+        # A single part would only add process startup and a merge, so one CPU renders here
+        num_parts = min(len(slot_items), os.cpu_count() or 1)
+        if PdfWriter is not None and len(slot_items) >= PARALLEL_PDF_MIN_SLOTS and num_parts >= 2:
+            # Worker processes render contiguous runs of slots as separate documents while
+            # the front pages build here, then the parts are concatenated in order
+            pool = _get_process_pool()
+            bounds = [len(slot_items) * i // num_parts for i in range(num_parts + 1)]
+            futures = []
+            drawn_earlier = {}    # hall seating digest -> slot it is first drawn in, over earlier parts
+            for lo, hi in zip(bounds, bounds[1:]):
+                part_items = slot_items[lo:hi]
+                part_seating = {key: slot_seating[key] for key, _ in part_items if key in slot_seating}
+                futures.append(pool.submit(_render_slot_pages, part_items, part_seating, lo == 0,
+                                           dict(drawn_earlier)))
+                for slot_key, exams in part_items:
+                    for hall_seating in self._slot_hall_seatings(slot_key, exams, slot_seating):
+                        digest = hall_seating.get('_hash')
+                        if digest is not None:
+                            drawn_earlier.setdefault(digest, f"{exams[0]['date']} {exams[0]['shift']}")
+            
+            front = io.BytesIO()
+            doc, _ = self._schedule_doc_template(front)
+            doc.build(elements)
+            writer = PdfWriter()
+            writer.append(front)
+            for future in futures:
+                writer.append(io.BytesIO(future.result()))
+            writer.write(stream)
+        else:
+            elements.extend(self._slot_elements(slot_items, slot_seating, usable_width, with_heading=True))
+            doc.build(elements)
+        
+        stream.seek(0)
+        return stream
+    
+    def _schedule_doc_template(self, stream):
+        """Landscape A4 document for the exam schedule PDF; returns (doc, usable_width)"""
+        LEFT_MARGIN = RIGHT_MARGIN = TOP_MARGIN = BOTTOM_MARGIN = 36
+        
+        page_width, _ = landscape(A4)
+        usable_width = page_width - (LEFT_MARGIN + RIGHT_MARGIN)
+        
+        doc = SimpleDocTemplate(
+            stream,
+            pagesize=landscape(A4),
+            rightMargin=RIGHT_MARGIN,
+            leftMargin=LEFT_MARGIN,
+            topMargin=TOP_MARGIN,
+            bottomMargin=BOTTOM_MARGIN
+        )
+        return doc, usable_width
+    
+    def _render_slot_pages(self, slot_items, slot_seating, with_heading, drawn_earlier=None):
+        """Slot pages of the exam schedule PDF for slot_items alone, as PDF bytes"""
+        stream = io.BytesIO()
+        doc, usable_width = self._schedule_doc_template(stream)
+        doc.build(self._slot_elements(slot_items, slot_seating, usable_width, with_heading, drawn_earlier))
+        return stream.getvalue()
+    
+    def _slot_hall_seatings(self, slot_key, exams, slot_seating):
+        """The SINGLE combined seating (one entry per hall) of a slot; schedules saved before
+        slot_seating existed carry it on every exam"""
+        return (slot_seating.get(slot_key, {}).get('seating')
+                or exams[0].get('seating_arrangement', []))
+    
+    def _slot_elements(self, slot_items, slot_seating, usable_width, with_heading, drawn_earlier=None):
+        """Flowables for the per-slot pages: banner, exams, halls and seating of each
+        (slot_key, exams) in slot_items, optionally under the section heading.
+        drawn_earlier maps hall seating digests already drawn in an earlier part of the
+        document to their slot; those get an unlinked note instead of a table"""
+        elements = []
+        
         # Detailed Schedule by Time Slot with SINGLE Seating Arrangement
-        elements.append(Paragraph("Detailed Examination Schedule with Seating Arrangements", section_style))
-        elements.append(Spacer(1, 0.3 * inch))
+        if with_heading:
+            elements.append(Paragraph("Detailed Examination Schedule with Seating Arrangements", SECTION_STYLE))
+            elements.append(Spacer(1, 0.3 * inch))
+
+        # Shared cells, as in generate_pdf; seating sizes vary by slot, so labels are made on demand.
+        # Slots with the same classes share one seating, so desk cells repeat too
+        row_labels = {}
+        col_headers = [""]
+        empty_desk = Paragraph("-", SLOT_CELL_STYLE)
+        desk_cells = {}    # (roll_no, class_name, is_leet) per seat (None = empty) -> Paragraph
 
-        row_label_style = ParagraphStyle('RowLabel', fontSize=9, leading=11, alignment=1, fontName="Helvetica-Bold")
-        cell_style = ParagraphStyle('Cell', fontSize=8, leading=10, alignment=1)
+        def row_label(r_idx):
+            label = row_labels.get(r_idx)
+            if label is None:
+                label = row_labels[r_idx] = Paragraph(f"R{r_idx + 1}", SLOT_ROW_LABEL_STYLE)
+            return label
+
+        def desk_cell(desk):
+            if not any(desk):
+                return empty_desk
+            desk_key = tuple((s['roll_no'], s['class_name'], s.get("is_leet", False)) if s else None for s in desk)
+            cell = desk_cells.get(desk_key)
+            if cell is None:
+                cell = desk_cells[desk_key] = Paragraph(" | ".join(
+                    f"<b>{s['roll_no']}</b> <font color='#1565c0' size='7'>({s['class_name']})</font>{'[L]' if s.get('is_leet', False) else ''}"
+                    if s else "-"
+                    for s in desk), SLOT_CELL_STYLE)
+            return cell
+
+        # A hall seating repeated in a later slot links back to its first table instead
+        seen_seatings = {digest: (where, None) for digest, where in (drawn_earlier or {}).items()}
+        # ^ digest of the hall seating -> (where it was drawn, anchor name; None in another part)
 
         # Process each unique time slot (date + shift)
-        processed_slots = set()
-        
-        for slot_key in sorted(exams_by_slot.keys()):
-            if slot_key in processed_slots:
-                continue
-            processed_slots.add(slot_key)
-            
-            exams = exams_by_slot[slot_key]
+        for slot_key, exams in slot_items:
             first_exam = exams[0]
             date = first_exam['date']
-            shift = first_exam.get('shift', 'Morning')
+            shift = first_exam['shift']
             
             # Slot Banner
             slot_banner = Table([[f"Date: {date} | Shift: {shift}"]],
                                 colWidths=[usable_width])
-            slot_banner.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#0d47a1")),
-                ("TEXTCOLOR", (0, 0), (-1, -1), colors.whitesmoke),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, -1), 16),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("TOPPADDING", (0, 0), (-1, -1), 10),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 10),
-            ]))
+            slot_banner.setStyle(SLOT_BANNER_TABLE_STYLE)
             elements.append(slot_banner)
             elements.append(Spacer(1, 0.2 * inch))
 
@@ -1000,29 +1922,21 @@ class SeatingPlanner:
             exam_classes_in_slot = first_exam.get('exam_classes_in_slot', [first_exam['class_name']])
             
             elements.append(Paragraph(
-                f"<b>Classes with Exams:</b> {', '.join(exam_classes_in_slot)}", 
-                ParagraphStyle('ClassesList', fontSize=11, leading=14, 
-                             textColor=colors.HexColor("#1565c0"), fontName="Helvetica-Bold")))
+                f"<b>Classes with Exams:</b> {', '.join(exam_classes_in_slot)}", CLASSES_LIST_STYLE))
             elements.append(Spacer(1, 0.15 * inch))
 
             # Show all subject-class combinations
-            exam_info = []
-            for exam in exams:
-                exam_info.append(f"• {exam['class_name']}: {exam['subject_name']} (Difficulty: {'★' * exam.get('difficulty', 1)})")
-            
-            exam_info_text = "<br/>".join(exam_info)
-            elements.append(Paragraph(exam_info_text, 
-                ParagraphStyle('ExamInfo', fontSize=10, leading=13, textColor=colors.black)))
+            exam_info_text = "<br/>".join(
+                f"• {exam['class_name']}: {exam['subject_name']} (Difficulty: {STARS[max(0, min(exam['difficulty'], 10))]})"
+                for exam in exams)
+            elements.append(Paragraph(exam_info_text, EXAM_INFO_STYLE))
             elements.append(Spacer(1, 0.2 * inch))
 
-            # Get SINGLE combined seating arrangement for this slot
-            seating_arrangement = first_exam.get('seating_arrangement', [])
+            seating_arrangement = self._slot_hall_seatings(slot_key, exams, slot_seating)
             
             if seating_arrangement:
                 # Show hall assignments with invigilators
-                elements.append(Paragraph("<b>Hall Assignments & Invigilators:</b>", 
-                    ParagraphStyle('HallHeader', fontSize=12, leading=16, 
-                                 textColor=colors.HexColor("#1565c0"), fontName="Helvetica-Bold")))
+                elements.append(Paragraph("<b>Hall Assignments & Invigilators:</b>", HALL_HEADER_STYLE))
                 elements.append(Spacer(1, 0.1 * inch))
                 
                 # Group halls and show their invigilators
@@ -1033,25 +1947,12 @@ class SeatingPlanner:
                     hall_name = exam['hall_name']
                     if hall_name not in halls_seen:
                         halls_seen.add(hall_name)
-                        invigilators = ", ".join(exam.get('invigilators', []))
+                        invigilators = ", ".join(exam['invigilators'])
                         capacity = exam.get('hall_capacity', 0)
                         hall_invigilator_data.append([hall_name, invigilators, str(capacity)])
                 
                 hall_table = Table(hall_invigilator_data, colWidths=[1.5*inch, 4*inch, 1*inch])
-                hall_table.setStyle(TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1565c0")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, 0), 10),
-                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#90caf9")),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 8),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-                    ("TOPPADDING", (0, 0), (-1, -1), 6),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-                    ("FONTSIZE", (0, 1), (-1, -1), 9),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#f0f8ff")),
-                ]))
+                hall_table.setStyle(HALL_TABLE_STYLE)
                 elements.append(hall_table)
                 elements.append(Spacer(1, 0.2 * inch))
                 
@@ -1059,15 +1960,12 @@ class SeatingPlanner:
                 if len(exam_classes_in_slot) > 1:
                     combined_note = Paragraph(
                         f"<b>COMBINED SEATING ARRANGEMENT</b><br/>"
-                        f"<i>Students from {', '.join(exam_classes_in_slot)} are seated together following anti-copying rules</i>", 
-                        ParagraphStyle('CombinedNote', fontSize=11, leading=14, 
-                                     textColor=colors.HexColor("#d32f2f"), fontName="Helvetica-Bold"))
+                        f"<i>Students from {', '.join(exam_classes_in_slot)} are seated together following anti-copying rules</i>",
+                        COMBINED_NOTE_STYLE)
                     elements.append(combined_note)
                     elements.append(Spacer(1, 0.15 * inch))
                 
-                elements.append(Paragraph("<b>Seating Arrangement:</b>", 
-                    ParagraphStyle('SeatingHeader', fontSize=12, leading=16, 
-                                 textColor=colors.HexColor("#1565c0"), fontName="Helvetica-Bold")))
+                elements.append(Paragraph("<b>Seating Arrangement:</b>", SEATING_HEADER_STYLE))
                 elements.append(Spacer(1, 0.1 * inch))
                 
                 for hall_seating in seating_arrangement:
@@ -1077,33 +1975,31 @@ class SeatingPlanner:
                     cols = hall_seating['columns']
                     occupied = hall_seating['occupied']
                     
+                    # Schedules built before seating carried a _hash are drawn in full
+                    digest = hall_seating.get('_hash')
+                    first_drawn = seen_seatings.get(digest)
+                    if first_drawn is None and digest is not None:
+                        anchor = f"seating-{digest}"
+                        seen_seatings[digest] = (f"{date} {shift}", anchor)
+                        elements.append(AnchorFlowable(anchor))
+                    
                     # Hall subtitle
-                    hall_subtitle = Paragraph(f"<b>{hall_name}</b> - Occupied: {occupied}", 
-                        ParagraphStyle('HallSubtitle', fontSize=11, leading=14, 
-                                     textColor=colors.HexColor("#283593"), fontName="Helvetica-Bold"))
+                    hall_subtitle = Paragraph(f"<b>{hall_name}</b> - Occupied: {occupied}", HALL_SUBTITLE_STYLE)
                     elements.append(hall_subtitle)
                     elements.append(Spacer(1, 0.1 * inch))
                     
-                    # Seating table
-                    table_data = [[""] + [f"C{i + 1}" for i in range(cols)]]
+                    if first_drawn is not None:
+                        where, anchor = first_drawn
+                        if anchor is not None:
+                            where = f'<a href="#{anchor}" color="#1565c0">{where}</a>'
+                        elements.append(Paragraph(f'Seating identical to {where}', SAME_SEATING_STYLE))
+                        elements.append(Spacer(1, 0.2 * inch))
+                        continue
                     
-                    for r_idx, row in enumerate(seating):
-                        row_cells = [Paragraph(f"R{r_idx + 1}", row_label_style)]
-                        for desk in row:
-                            if all(s is None for s in desk):
-                                row_cells.append(Paragraph("-", cell_style))
-                                continue
-                            
-                            parts = []
-                            for student in desk:
-                                if student:
-                                    leet_marker = "[L]" if student.get("is_leet", False) else ""
-                                    class_name = student['class_name']
-                                    parts.append(f"<b>{student['roll_no']}</b> <font color='#1565c0' size='7'>({class_name})</font>{leet_marker}")
-                                else:
-                                    parts.append("-")
-                            row_cells.append(Paragraph(" | ".join(parts), cell_style))
-                        table_data.append(row_cells)
+                    # Seating table
+                    col_headers.extend(f"C{c + 1}" for c in range(len(col_headers) - 1, cols))
+                    table_data = [col_headers[:cols + 1]] + [[row_label(r_idx)] + [desk_cell(desk) for desk in row]
+                                                             for r_idx, row in enumerate(seating)]
                     
                     row_label_col = 0.5 * inch
                     per_col = (usable_width - row_label_col) / max(cols, 1)
@@ -1113,42 +2009,14 @@ class SeatingPlanner:
                     
                     seating_table = Table(table_data, colWidths=col_widths, repeatRows=1)
                     
-                    style = [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1565c0")),
-                        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                        ("FONTSIZE", (0, 0), (-1, 0), 9),
-                        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-                        
-                        ("BACKGROUND", (0, 1), (0, -1), colors.HexColor("#e3f2fd")),
-                        ("TEXTCOLOR", (0, 1), (0, -1), colors.HexColor("#0d47a1")),
-                        ("FONTNAME", (0, 1), (0, -1), "Helvetica-Bold"),
-                        ("ALIGN", (0, 1), (0, -1), "CENTER"),
-                        
-                        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#90caf9")),
-                        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                        ("TOPPADDING", (0, 0), (-1, -1), 4),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-                        ("FONTSIZE", (1, 1), (-1, -1), 8),
-                    ]
-                    
-                    for i in range(1, len(table_data)):
-                        bg_color = colors.HexColor("#f8fbff") if i % 2 == 0 else colors.white
-                        style.append(("BACKGROUND", (1, i), (-1, i), bg_color))
-                    
-                    seating_table.setStyle(TableStyle(style))
+                    seating_table.setStyle(SLOT_SEATING_TABLE_STYLE)
                     elements.append(seating_table)
                     elements.append(Spacer(1, 0.2 * inch))
             else:
-                elements.append(Paragraph("<i>No seating arrangement available</i>", 
-                    ParagraphStyle('NoSeating', fontSize=10, leading=14, 
-                                 textColor=colors.HexColor("#999999"), fontName="Helvetica-Oblique")))
+                elements.append(Paragraph("<i>No seating arrangement available</i>", NO_SEATING_STYLE))
                 elements.append(Spacer(1, 0.1 * inch))
 
             elements.append(Spacer(1, 0.3 * inch))
             elements.append(PageBreak())
 
-        doc.build(elements)
-        return pdf_path
\ No newline at end of file
+        return elements
\ No newline at end of file